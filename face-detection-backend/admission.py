@@ -0,0 +1,101 @@
+"""
+Admission control for detection work
+Bounds the number of frames being analyzed or waiting, and lets students who are
+already in a suspicious state jump ahead of calm ones when the server falls behind
+"""
+import heapq
+import itertools
+import threading
+import time
+
+# Priority levels (lower value = served first)
+PRIORITY_FLAGGED = 0  # student is suspicious or being tracked for persistence
+PRIORITY_CALM = 1     # student has been behaving normally
+PRIORITY_BATCH = 2    # catch-up uploads, served last
+
+
+class AdmissionController:
+    """
+    Bounded pending-work queue in front of the face detector
+
+    At most `max_concurrent` frames are analyzed at once. Further requests wait in a
+    priority queue of at most `max_pending` entries; calm and batch requests may only
+    use `calm_share` of that queue so flagged students always find room. Requests that
+    cannot be queued, or that wait longer than `wait_timeout` seconds, are rejected.
+    """
+
+    def __init__(self, max_concurrent, max_pending, wait_timeout, calm_share=0.5):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_pending = max(0, int(max_pending))
+        self.wait_timeout = wait_timeout
+        self.calm_limit = int(self.max_pending * calm_share)
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def acquire(self, priority=PRIORITY_CALM, retry=False):
+        """
+        Wait for a detection slot. Returns True if admitted, False if overloaded.
+        Set `retry` when asking again for work that was already refused, so the
+        refusal counters count each piece of work once.
+        """
+        with self._cond:
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                self._admitted += 1
+                return True
+
+            limit = self.max_pending if priority == PRIORITY_FLAGGED else self.calm_limit
+            if len(self._waiting) >= limit:
+                if not retry:
+                    self._rejected += 1
+                return False
+
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            deadline = time.monotonic() + self.wait_timeout
+
+            while True:
+                if self._waiting[0] == entry and self._active < self.max_concurrent:
+                    heapq.heappop(self._waiting)
+                    self._active += 1
+                    self._admitted += 1
+                    # Another slot may still be free for the next waiter
+                    self._cond.notify_all()
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    if not retry:
+                        self._timed_out += 1
+                    self._cond.notify_all()
+                    return False
+
+                self._cond.wait(remaining)
+
+    def release(self):
+        """Return a detection slot and wake the highest-priority waiter"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """Return current queue state and counters for health checks"""
+        with self._cond:
+            return {
+                'active': self._active,
+                'pending': len(self._waiting),
+                'max_concurrent': self.max_concurrent,
+                'max_pending': self.max_pending,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out
+            }
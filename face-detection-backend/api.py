@@ -1,8 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, make_response, send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+import base64
 import cv2
+import functools
+import hmac
+import itertools
 import numpy as np
-import base64
 import os
 from datetime import datetime
 import threading
@@ -14,13 +18,51 @@ import sys
 # Import configuration
 from config import (
     HOST, PORT, DEBUG_MODE, SUSPICIOUS_FRAMES_DIR, LOG_DIR,
-    FACE_CONFIDENCE_THRESHOLD, FACE_VISIBILITY_THRESHOLD, EDGE_MARGIN_PIXELS,
-    FRAME_SAVE_COOLDOWN, MIN_SUSPICIOUS_DURATION, FRAME_PROCESS_INTERVAL,
-    MIN_FACE_SIZE, SCALE_FACTOR, MIN_NEIGHBORS,
+    FACE_CONFIDENCE_THRESHOLD,
+    FRAME_SAVE_COOLDOWN, MIN_SUSPICIOUS_DURATION, EVIDENCE_REQUEST_TIMEOUT, FRAME_PROCESS_INTERVAL,
     LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
-    MAX_FRAME_SIZE_MB, MAX_BATCH_SIZE, ALLOWED_ORIGINS,
+    MAX_FRAME_SIZE_MB, MAX_BATCH_SIZE, ALLOWED_ORIGINS, ADMIN_TOKEN,
+    BATCH_JOB_WORKERS, BATCH_JOB_MAX_JOBS, BATCH_JOB_MAX_QUEUED_MB, BATCH_JOB_TTL_SECONDS, LOCAL_SOCKET_PATH, LOCAL_TCP_PORT,
+    PROFILING_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_MAX_FILES,
+    CAPTURE_ENABLED, CAPTURE_PATH, CAPTURE_MAX_MB,
+    LIVE_STATUS_STALE_SECONDS, LIVE_STATUS_TTL_SECONDS, LIVE_STATUS_EVENTS_ENABLED, LIVE_STATUS_STREAM_SECONDS,
+    RETENTION_ENABLED, RETENTION_MAX_AGE_DAYS, RETENTION_MAX_TOTAL_MB,
+    RETENTION_MAX_FILES_PER_STUDENT, MIN_FREE_DISK_MB, RETENTION_FREE_DISK_MB, RETENTION_PROTECT_HOURS,
+    RETENTION_INTERVAL_SECONDS,
+    SCALE_CALIBRATION_ENABLED, SCALE_CALIBRATION_SAMPLES, SCALE_CALIBRATION_MARGIN,
+    SCALE_RECALIBRATION_FRAMES, SCALE_FULL_SCAN_FRAMES, TIERED_DETECTION_ENABLED,
+    EVIDENCE_DEDUP_ENABLED, EVIDENCE_DEDUP_MAX_DISTANCE, EVIDENCE_DEDUP_WINDOW_SECONDS,
+    DETECTION_WORKERS, OPENCV_THREADS, PIN_CPU_CORES, SERVER_PROCESSES,
+    MAX_CONCURRENT_DETECTIONS, MAX_PENDING_FRAMES, ADMISSION_WAIT_TIMEOUT,
+    CALM_QUEUE_SHARE, OVERLOAD_RESPONSE, RETRY_AFTER_SECONDS,
+    STATE_BACKEND, STATE_LOCK_STRIPES, STATE_DB_PATH, STATE_DB_POOL_SIZE,
+    STATE_REDIS_URL, STATE_KEY_PREFIX, STATE_TTL_SECONDS,
     ensure_directories, get_config_summary
 )
+from admission import (
+    AdmissionController, PRIORITY_FLAGGED, PRIORITY_CALM, PRIORITY_BATCH
+)
+from state_backend import (
+    create_state_backend, SAVE_COOLDOWN, SAVE_FIRST_SEEN, SAVE_PENDING, SAVE_READY
+)
+from frame_format import (
+    FRAME_CONTENT_TYPES, FORMAT_JPEG, FrameFormatError, FrameTooLargeError, FrameRecord,
+    parse_frame, read_frames
+)
+from upload_stream import UploadTooLargeError, iter_multipart
+from local_transport import LocalFrameServer, UNIX_SOCKETS_AVAILABLE
+from profiling import RequestProfiler
+from capture import FrameRecorder
+from retention import RetentionManager
+from detection import (
+    EVIDENCE_REASONS, init_detector, detect_face_and_validate, detect_frame_record, gray_buffers
+)
+from calibration import ScaleCalibrator
+from tiered_detection import TieredDetector, student_detector
+from evidence_dedup import DEDUP_REASONS, DUPLICATE_LOG, EvidenceIndex, perceptual_hash, read_references
+from execution_plan import build_plan, apply_plan
+from live_status import LiveStatusIndex
+from batch_jobs import BatchJobManager, JobLimitError
 
 app = Flask(__name__)
 
@@ -69,52 +111,194 @@ def setup_logging():
 
 logger = setup_logging()
 
-# Track last save time and issue start time per student
-last_save_time = {}  # {student_id: timestamp}
-issue_start_time = {}  # {student_id: {reason: timestamp}}
-frame_counter = {}  # {student_id: counter}
+# Track frame counter, last save time and issue start time per student
+# (in-process, SQLite or Redis depending on STATE_BACKEND)
+try:
+    state = create_state_backend(
+        STATE_BACKEND,
+        stripes=STATE_LOCK_STRIPES,
+        sqlite_path=STATE_DB_PATH,
+        sqlite_pool_size=STATE_DB_POOL_SIZE,
+        redis_url=STATE_REDIS_URL,
+        redis_prefix=STATE_KEY_PREFIX,
+        redis_ttl=STATE_TTL_SECONDS
+    )
+    logger.info(f"Student state backend: {state.name}")
+except Exception as e:
+    logger.critical(f"Failed to initialize state backend '{STATE_BACKEND}': {e}")
+    raise
+
+# Match detection concurrency and OpenCV threading to the cores we may actually use
+execution_plan = build_plan(
+    detection_workers=DETECTION_WORKERS,
+    opencv_threads=OPENCV_THREADS,
+    pin_cores=PIN_CPU_CORES,
+    processes=SERVER_PROCESSES
+)
+apply_plan(execution_plan)
+logger.info(
+    f"Execution plan: {execution_plan['detection_workers']} detection workers x "
+    f"{execution_plan['opencv_threads']} OpenCV threads on {execution_plan['cpus_per_process']} of "
+    f"{execution_plan['usable_cpus']} usable CPUs ({execution_plan['processes']} processes)"
+)
+if execution_plan['oversubscribed']:
+    logger.warning("⚠️ SERVER_PROCESSES x DETECTION_WORKERS x OPENCV_THREADS exceeds the usable CPUs")
+
+# Bounded queue in front of the detector so overload degrades instead of piling up
+admission = AdmissionController(
+    max_concurrent=MAX_CONCURRENT_DETECTIONS or execution_plan['detection_workers'],
+    max_pending=MAX_PENDING_FRAMES,
+    wait_timeout=ADMISSION_WAIT_TIMEOUT,
+    calm_share=CALM_QUEUE_SHARE
+)
+# Raw frames are converted in pooled buffers, one per detection slot
+gray_buffers.max_free = admission.max_concurrent
+
+# Background evidence retention (age / size / per-student caps, free disk guard)
+retention = RetentionManager(
+    SUSPICIOUS_FRAMES_DIR,
+    max_age_seconds=RETENTION_MAX_AGE_DAYS * 86400,
+    max_total_bytes=RETENTION_MAX_TOTAL_MB * 1024 * 1024,
+    max_files_per_student=RETENTION_MAX_FILES_PER_STUDENT,
+    min_free_bytes=MIN_FREE_DISK_MB * 1024 * 1024,
+    reclaim_free_bytes=RETENTION_FREE_DISK_MB * 1024 * 1024,
+    protect_seconds=RETENTION_PROTECT_HOURS * 3600,
+    interval=RETENTION_INTERVAL_SECONDS,
+    logger=logger
+)
+if RETENTION_ENABLED:
+    retention.start()
+
+# Opt-in request profiling (views are left untouched when disabled)
+profiler = RequestProfiler(
+    enabled=PROFILING_ENABLED,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    directory=PROFILE_DIR,
+    max_files=PROFILE_MAX_FILES
+)
+if PROFILING_ENABLED and not ADMIN_TOKEN:
+    logger.warning("⚠️ PROFILING_ENABLED without ADMIN_TOKEN: profiles can only be downloaded by direct localhost callers")
+
+def profile_requested():
+    """True if the client asked for this request to be profiled"""
+    return request.headers.get('X-Profile', '').lower() in ('1', 'true')
+
+def profiled(view):
+    """Profile selected calls of a view (per-request X-Profile header or 1-in-N sampling)"""
+    return profiler.wrap(view, profile_requested, logger)
+
+# Opt-in capture of /analyze-frame traffic for scripts/replay_capture.py
+frame_recorder = FrameRecorder(CAPTURE_PATH, CAPTURE_MAX_MB * 1024 * 1024, logger) if CAPTURE_ENABLED else None
+
+def captured(view):
+    """Record each call's raw body, verdict and latency (view is untouched when capture is off)"""
+    if frame_recorder is None:
+        return view
+    
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        arrived = time.time()
+        body = request.get_data(cache=True)  # the view reads the cached copy
+        start = time.perf_counter()
+        response = make_response(view(*args, **kwargs))
+        latency_ms = (time.perf_counter() - start) * 1000
+        
+        student_id = request.headers.get('X-Student-Id') or request.args.get('student_id')
+        if not student_id:
+            student_id = (request.get_json(silent=True) or {}).get('student_id', 'unknown')
+        result = response.get_json(silent=True) or {}
+        try:
+            frame_recorder.record(
+                arrived, latency_ms, student_id, request.content_type, result.get('reason'), body,
+                query_string=request.query_string.decode('utf-8', 'replace'),
+                session_id=request.headers.get('X-Session-Id', '')
+            )
+        except OSError as e:
+            logger.error(f"❌ Failed to capture frame: {e}")
+        return response
+    
+    return wrapper
 
 # Load pre-trained face detector
 try:
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-    )
-    if face_cascade.empty():
-        logger.error("Failed to load face cascade classifier")
-        raise RuntimeError("Face cascade classifier not loaded")
+    init_detector()
     logger.info("Face cascade classifier loaded successfully")
 except Exception as e:
     logger.critical(f"Failed to initialize face detection: {e}")
     raise
 
+# Per-student face-scale calibration (tight minSize/maxSize once the face size is known)
+scale_calibrator = ScaleCalibrator(
+    samples=SCALE_CALIBRATION_SAMPLES,
+    margin=SCALE_CALIBRATION_MARGIN,
+    relearn_frames=SCALE_RECALIBRATION_FRAMES,
+    full_scan_frames=SCALE_FULL_SCAN_FRAMES
+)
+
+# Cheap low-resolution screening; only anomalies are confirmed at full resolution
+tiered_detector = TieredDetector()
+
+def face_detector_for(student_id):
+    """Face detector for the student: calibrated and/or tiered (None = full scale range)"""
+    return student_detector(
+        str(student_id),
+        tiers=tiered_detector if TIERED_DETECTION_ENABLED else None,
+        calibrator=scale_calibrator if SCALE_CALIBRATION_ENABLED else None
+    )
+
+# Recently saved evidence per student, to store near-duplicates as references
+evidence_index = EvidenceIndex(
+    max_distance=EVIDENCE_DEDUP_MAX_DISTANCE,
+    window_seconds=EVIDENCE_DEDUP_WINDOW_SECONDS
+)
+
+# Latest verdict of every student per exam session, for class-wide dashboards
+live_status = LiveStatusIndex(
+    stale_seconds=LIVE_STATUS_STALE_SECONDS,
+    session_ttl=LIVE_STATUS_TTL_SECONDS
+)
+DEFAULT_SESSION = 'default'
+LIVE_STATUS_KEEPALIVE_SECONDS = 15
+
 def save_suspicious_frame(frame, reason, student_id=None):
-    """Save suspicious frame to disk with cooldown and persistence check"""
+    """
+    Save suspicious frame to disk with cooldown and persistence check
+    `frame` is the EvidenceFrame attached to a suspicious detection result
+    Returns (frame path, duplicate_of): the path is None when nothing was recorded;
+    for a near-duplicate it is the earlier image and duplicate_of its file name.
+    """
     current_time = time.time()
     student_key = str(student_id) if student_id else "unknown"
     
     logger.info(f"📸 Attempting to save frame for {student_key} - Reason: {reason}")
     
+    # Cooldown and persistence checks run as one atomic per-student operation;
+    # a SAVE_READY outcome already reserves the cooldown slot for this save
+    outcome, seconds = state.check_save(
+        student_key, reason, current_time, FRAME_SAVE_COOLDOWN, MIN_SUSPICIOUS_DURATION
+    )
+    
     # Check cooldown - don't save if we saved recently for this student
-    if student_key in last_save_time:
-        time_since_last_save = current_time - last_save_time[student_key]
-        if time_since_last_save < FRAME_SAVE_COOLDOWN:
-            logger.info(f"⏳ Cooldown active for {student_key}: {time_since_last_save:.1f}s < {FRAME_SAVE_COOLDOWN}s")
-            return None  # Skip saving, too soon
+    if outcome == SAVE_COOLDOWN:
+        logger.info(f"⏳ Cooldown active for {student_key}: {seconds:.1f}s < {FRAME_SAVE_COOLDOWN}s")
+        return None, None  # Skip saving, too soon
     
     # Check if issue is persistent (not just a momentary glitch)
-    if student_key not in issue_start_time:
-        issue_start_time[student_key] = {}
-    
-    if reason not in issue_start_time[student_key]:
-        # First time seeing this issue, record start time
-        issue_start_time[student_key][reason] = current_time
+    if outcome == SAVE_FIRST_SEEN:
         logger.info(f"⏱️  First occurrence of '{reason}' for {student_key}, tracking persistence (need {MIN_SUSPICIOUS_DURATION}s)")
-        return None  # Don't save yet, wait to see if it persists
+        return None, None  # Don't save yet, wait to see if it persists
     
-    issue_duration = current_time - issue_start_time[student_key][reason]
-    if issue_duration < MIN_SUSPICIOUS_DURATION:
+    issue_duration = seconds
+    if outcome == SAVE_PENDING:
         logger.info(f"⏱️  Issue '{reason}' for {student_key}: {issue_duration:.1f}s / {MIN_SUSPICIOUS_DURATION}s (not persistent yet)")
-        return None  # Issue hasn't persisted long enough
+        return None, None  # Issue hasn't persisted long enough
+    
+    # Refuse to write on a (nearly) full disk - the write would fail half-way
+    if not retention.has_free_space():
+        logger.error(f"❌ Less than {MIN_FREE_DISK_MB}MB free in {SUSPICIOUS_FRAMES_DIR}, frame for {student_key} not saved")
+        retention.trigger()
+        state.cancel_save(student_key, current_time)
+        return None, None
     
     # Issue is persistent and cooldown has passed, save it
     try:
@@ -122,138 +306,103 @@ def save_suspicious_frame(frame, reason, student_id=None):
         student_folder = os.path.join(SUSPICIOUS_FRAMES_DIR, student_key)
         os.makedirs(student_folder, exist_ok=True)
         
+        # Near-identical to a frame saved moments ago (the same empty chair):
+        # keep the timeline entry but point at the existing image
+        dedup = EVIDENCE_DEDUP_ENABLED and reason in DEDUP_REASONS
+        frame_hash = perceptual_hash(frame.gray) if dedup else None
+        if frame_hash is not None:
+            duplicate = evidence_index.find_duplicate(student_key, reason, frame_hash, current_time)
+            if duplicate and os.path.exists(duplicate[0]):
+                original_path, distance = duplicate
+                original_name = os.path.basename(original_path)
+                evidence_index.write_reference(student_folder, {
+                    'timestamp': timestamp,
+                    'reason': reason,
+                    'duplicate_of': original_name,
+                    'distance': distance
+                })
+                state.release_evidence_request(student_key)
+                logger.warning(f"🔁 SUSPICIOUS ACTIVITY RECORDED: {student_key} - {reason} - same as {original_name} (distance {distance})")
+                return original_path, original_name
+        
         filename = f"{reason}_{timestamp}.jpg"
         filepath = os.path.join(student_folder, filename)
         
         logger.info(f"💾 Writing frame to: {filepath}")
-        success = cv2.imwrite(filepath, frame)
+        success = frame.write(filepath)
         if not success:
             logger.error(f"❌ Failed to write frame to {filepath}")
-            return None
-            
-        last_save_time[student_key] = current_time
+            state.cancel_save(student_key, current_time)
+            return None, None
+        
+        if frame_hash is not None:
+            evidence_index.remember(student_key, reason, frame_hash, filepath, current_time)
+        state.release_evidence_request(student_key)
+        
         logger.warning(f"🚨 SUSPICIOUS ACTIVITY SAVED: {student_key} - {reason} - Persisted for {issue_duration:.1f}s")
         logger.warning(f"📁 Frame saved to: {filepath}")
         
-        return filepath
+        return filepath, None
     except Exception as e:
         logger.error(f"❌ Error saving suspicious frame for {student_key}: {e}", exc_info=True)
-        return None
+        state.cancel_save(student_key, current_time)
+        return None, None
+
+def request_evidence(reason, student_id=None):
+    """
+    Persistence/cooldown check for frames that arrived without a color image
+    (raw grayscale uploads). Returns True when a frame would be saved now, so the
+    client should resend this moment as a full-quality JPEG. The request stays
+    outstanding until that JPEG is saved or EVIDENCE_REQUEST_TIMEOUT passes, so
+    the following raw frames of the same moment do not ask again.
+    """
+    current_time = time.time()
+    student_key = str(student_id) if student_id else "unknown"
+    
+    outcome, _ = state.check_save(
+        student_key, reason, current_time, FRAME_SAVE_COOLDOWN, MIN_SUSPICIOUS_DURATION
+    )
+    if outcome != SAVE_READY:
+        return False
+    
+    # Nothing was written yet - release the slot so the JPEG can claim it
+    state.cancel_save(student_key, current_time)
+    if not state.reserve_evidence_request(student_key, current_time, EVIDENCE_REQUEST_TIMEOUT):
+        return False  # already asked, waiting for the JPEG
+    logger.info(f"📷 Requesting full-quality evidence frame from {student_key} - {reason}")
+    return True
 
 def clear_student_issue(student_id, reason=None):
     """Clear issue tracking when student returns to normal"""
     student_key = str(student_id) if student_id else "unknown"
-    if student_key in issue_start_time:
-        if reason:
-            issue_start_time[student_key].pop(reason, None)
-        else:
-            issue_start_time[student_key] = {}
+    state.clear_issues(student_key, reason)
 
-def detect_face_and_validate(frame_data):
-    """
-    Detect face in frame and validate visibility
-    Returns: {
-        'face_detected': bool,
-        'fully_visible': bool,
-        'face_coverage': float (0-1),
-        'face_location': (x, y, w, h) or None,
-        'cheating_detected': bool,
-        'reason': str
-    }
-    """
-    try:
-        # Convert base64 to image
-        nparr = np.frombuffer(base64.b64decode(frame_data), np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            return {
-                'face_detected': False,
-                'fully_visible': False,
-                'cheating_detected': True,
-                'reason': 'invalid_frame',
-                'face_coverage': 0
-            }
-        
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        h, w = frame.shape[:2]
-        frame_area = h * w
-        
-        # Detect faces (balanced for performance and accuracy)
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=SCALE_FACTOR,
-            minNeighbors=MIN_NEIGHBORS,
-            minSize=MIN_FACE_SIZE
-        )
-        
-        # No face detected
-        if len(faces) == 0:
-            return {
-                'face_detected': False,
-                'fully_visible': False,
-                'cheating_detected': True,
-                'reason': 'face_not_detected',
-                'face_coverage': 0,
-                'frame': frame
-            }
-        
-        # Multiple faces detected (cheating attempt)
-        if len(faces) > 1:
-            return {
-                'face_detected': True,
-                'fully_visible': False,
-                'cheating_detected': True,
-                'reason': 'multiple_faces_detected',
-                'face_coverage': 0,
-                'frame': frame,
-                'face_count': len(faces)
-            }
-        
-        # Single face detected - validate visibility
-        x, y, face_w, face_h = faces[0]
-        face_area = face_w * face_h
-        face_coverage = face_area / frame_area
-        
-        # Check if face is at frame edges (partially out of frame)
-        # More lenient edge detection - only flag if truly at edge
-        is_at_edge = (x < EDGE_MARGIN_PIXELS or 
-                      y < EDGE_MARGIN_PIXELS or 
-                      (x + face_w) > (w - EDGE_MARGIN_PIXELS) or 
-                      (y + face_h) > (h - EDGE_MARGIN_PIXELS))
-        
-        # Much more lenient visibility check
-        # Only flag if face is REALLY small (far away) or actually out of frame
-        is_fully_visible = (
-            face_coverage >= FACE_VISIBILITY_THRESHOLD and 
-            not is_at_edge
-        )
-        
-        # Additional check: If face coverage is reasonable (>5%), consider it OK even if at edge slightly
-        # This prevents false positives for normal sitting positions
-        if face_coverage >= 0.05 and not is_at_edge:
-            is_fully_visible = True
-        
-        result = {
-            'face_detected': True,
-            'fully_visible': is_fully_visible,
-            'face_coverage': float(face_coverage),
-            'face_location': {'x': int(x), 'y': int(y), 'w': int(face_w), 'h': int(face_h)},
-            'cheating_detected': not is_fully_visible,
-            'reason': 'ok' if is_fully_visible else ('face_out_of_frame' if is_at_edge else 'face_partially_visible'),
-            'frame': frame
-        }
-        
-        return result
-        
-    except Exception as e:
+def overload_result():
+    """Body for a frame that could not be admitted for analysis (see OVERLOAD_RESPONSE)"""
+    if OVERLOAD_RESPONSE == 'skip':
         return {
-            'face_detected': False,
-            'fully_visible': False,
-            'cheating_detected': True,
-            'reason': f'error: {str(e)}',
-            'face_coverage': 0
+            'frame_skipped': True,
+            'degraded': True,
+            'face_detected': True,
+            'fully_visible': True,
+            'cheating_detected': False,
+            'reason': 'server_overloaded',
+            'message': 'Server overloaded, frame skipped'
         }
+    
+    return {
+        'error': 'Server overloaded, retry later',
+        'reason': 'server_overloaded',
+        'retry_after': RETRY_AFTER_SECONDS
+    }
+
+def overload_response():
+    """Response returned when a frame could not be admitted for analysis"""
+    response = jsonify(overload_result())
+    if OVERLOAD_RESPONSE != 'skip':
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -263,7 +412,17 @@ def health():
         'service': 'Cheating Detection API',
         'version': '2.0.0',
         'timestamp': datetime.now().isoformat(),
-        'configuration': get_config_summary()
+        'configuration': get_config_summary(),
+        'admission': admission.snapshot(),
+        'state': state.describe(),
+        'retention': retention.snapshot(),
+        'scale_calibration': scale_calibrator.snapshot(),
+        'tiered_detection': tiered_detector.snapshot(),
+        'evidence_dedup': evidence_index.snapshot(),
+        'capture': frame_recorder.snapshot() if frame_recorder else None,
+        'live_status': live_status.snapshot(),
+        'execution_plan': execution_plan,
+        'batch_jobs': batch_jobs.snapshot()
     })
 
 @app.route('/test-detection', methods=['POST'])
@@ -299,6 +458,8 @@ def test_detection():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/analyze-frame', methods=['POST'])
+@profiled
+@captured
 def analyze_frame():
     """
     Analyze a single frame for cheating detection
@@ -324,89 +485,144 @@ def analyze_frame():
     }
     """
     try:
-        data = request.json
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+        if is_raw_frame_request():
+            # Binary frame (see frame_format) - student id travels in a header/query arg
+            student_id = request.headers.get('X-Student-Id') or request.args.get('student_id', 'unknown')
+            session_id = request.headers.get('X-Session-Id') or request.args.get('session_id', DEFAULT_SESSION)
+            force_process = request.args.get('force_process', 'false').lower() == 'true'
             
-        frame_b64 = data.get('frame')
-        student_id = data.get('student_id', 'unknown')
-        force_process = data.get('force_process', False)  # Allow override
-        
-        if not frame_b64:
-            return jsonify({'error': 'No frame provided'}), 400
-        
-        # Validate frame size
-        frame_size_mb = len(frame_b64) / (1024 * 1024)
-        if frame_size_mb > MAX_FRAME_SIZE_MB:
-            logger.warning(f"Frame size exceeds limit: {frame_size_mb:.2f}MB")
-            return jsonify({'error': f'Frame size exceeds {MAX_FRAME_SIZE_MB}MB limit'}), 413
-        
-        student_key = str(student_id)
-        
-        # Frame skipping for performance - only process every Nth frame
-        if not force_process and FRAME_PROCESS_INTERVAL > 1:
-            if student_key not in frame_counter:
-                frame_counter[student_key] = 1  # Start at 1 so first frame is processed
-            else:
-                frame_counter[student_key] += 1
+            body = request.get_data(cache=False)
+            frame_size_mb = len(body) / (1024 * 1024)
+            if frame_size_mb > MAX_FRAME_SIZE_MB:
+                logger.warning(f"Frame size exceeds limit: {frame_size_mb:.2f}MB")
+                return jsonify({'error': f'Frame size exceeds {MAX_FRAME_SIZE_MB}MB limit'}), 413
             
-            if frame_counter[student_key] % FRAME_PROCESS_INTERVAL != 0:
-                # Skip this frame, return last known state or assume OK
-                return jsonify({
-                    'frame_skipped': True,
-                    'face_detected': True,
-                    'fully_visible': True,
-                    'cheating_detected': False,
-                    'reason': 'frame_skipped_for_performance',
-                    'message': 'Frame skipped to reduce CPU load'
-                })
-        
-        result = detect_face_and_validate(frame_b64)
-        result['frame_skipped'] = False
-        
-        # Log detection result
-        logger.info(f"👤 Student {student_id}: face_detected={result.get('face_detected')}, cheating={result.get('cheating_detected')}, reason={result.get('reason')}, coverage={result.get('face_coverage', 0):.2%}")
-        
-        # Clear issue tracking if everything is OK
-        if not result['cheating_detected']:
-            clear_student_issue(student_id)
-            logger.debug(f"✅ Student {student_id}: monitoring normal")
-        else:
-            logger.info(f"⚠️  Student {student_id}: Suspicious activity detected - {result.get('reason')}")
-        
-        # 🔒 CRITICAL: Save suspicious frame ONLY if cheating detected
-        frame_saved = False
-        frame_path = None
-        
-        if result['cheating_detected'] and 'frame' in result:
-            logger.info(f"🔍 Cheating detected for {student_id}, attempting to save frame...")
             try:
-                frame_path = save_suspicious_frame(
-                    result['frame'],
-                    result['reason'],
-                    student_id
-                )
-                if frame_path:  # Only set to True if actually saved
-                    frame_saved = True
-                    logger.info(f"✅ Frame successfully saved: {frame_path}")
-                else:
-                    logger.info(f"⏳ Frame not saved (waiting for persistence or cooldown)")
-            except Exception as e:
-                logger.error(f"❌ Error saving frame for {student_id}: {e}", exc_info=True)
-        
-        # Remove frame from response (it's binary data)
-        if 'frame' in result:
-            del result['frame']
+                record, _ = parse_frame(body)
+            except FrameFormatError as e:
+                return jsonify({'error': f'Invalid binary frame: {e}'}), 400
+            
+            detect = lambda: detect_frame_record(record, detector=face_detector_for(student_id))
+        else:
+            data = request.json
+            if not data:
+                return jsonify({'error': 'No JSON data provided'}), 400
+                
+            frame_b64 = data.get('frame')
+            student_id = data.get('student_id', 'unknown')
+            session_id = data.get('session_id') or DEFAULT_SESSION
+            force_process = data.get('force_process', False)  # Allow override
+            
+            if not frame_b64:
+                return jsonify({'error': 'No frame provided'}), 400
+            
+            # Validate frame size
+            frame_size_mb = len(frame_b64) / (1024 * 1024)
+            if frame_size_mb > MAX_FRAME_SIZE_MB:
+                logger.warning(f"Frame size exceeds limit: {frame_size_mb:.2f}MB")
+                return jsonify({'error': f'Frame size exceeds {MAX_FRAME_SIZE_MB}MB limit'}), 413
+            
+            detect = lambda: detect_face_and_validate(frame_b64, detector=face_detector_for(student_id))
         
-        result['frame_saved'] = frame_saved
-        if frame_path:
-            result['frame_path'] = frame_path
+        result = process_student_frame(detect, student_id, force_process, session_id)
+        if result is None:
+            return overload_response()
         
         return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def is_raw_frame_request():
+    """True if the request body is a binary frame rather than JSON"""
+    return request.mimetype in FRAME_CONTENT_TYPES
+
+def process_student_frame(detect, student_id, force_process=False, session_id=DEFAULT_SESSION):
+    """
+    Run one student frame through skipping, admission, detection and evidence saving
+    `detect` is a callable returning the detection result for the frame.
+    Returns the response dict, or None if the frame was not admitted (overload).
+    The student's entry in the session's live status is updated with the result.
+    """
+    student_key = str(student_id)
+    
+    # One state round trip per frame: frame counter (for skipping) and issue flag (for priority)
+    count_frame = not force_process and FRAME_PROCESS_INTERVAL > 1
+    count, flagged = state.frame_state(student_key, count_frame)
+    
+    # Frame skipping for performance - only process every Nth frame
+    if count_frame:
+        if count % FRAME_PROCESS_INTERVAL != 0:
+            # Skip this frame, return last known state or assume OK
+            live_status.update(str(session_id), student_key, {'frame_skipped': True})
+            return {
+                'frame_skipped': True,
+                'face_detected': True,
+                'fully_visible': True,
+                'cheating_detected': False,
+                'reason': 'frame_skipped_for_performance',
+                'message': 'Frame skipped to reduce CPU load'
+            }
+    
+    # Admission control - flagged students are served before calm ones
+    priority = PRIORITY_FLAGGED if flagged else PRIORITY_CALM
+    if not admission.acquire(priority):
+        logger.warning(f"🚦 Overloaded, frame from {student_id} not admitted (priority={priority})")
+        return None
+    
+    try:
+        result = detect()
+    finally:
+        admission.release()
+    result['frame_skipped'] = False
+    
+    # Log detection result
+    logger.info(f"👤 Student {student_id}: face_detected={result.get('face_detected')}, cheating={result.get('cheating_detected')}, reason={result.get('reason')}, coverage={result.get('face_coverage', 0):.2%}")
+    
+    # Clear issue tracking if everything is OK (no write when nothing is tracked)
+    if not result['cheating_detected']:
+        if flagged:
+            clear_student_issue(student_id)
+        logger.debug(f"✅ Student {student_id}: monitoring normal")
+    else:
+        logger.info(f"⚠️  Student {student_id}: Suspicious activity detected - {result.get('reason')}")
+    
+    # 🔒 CRITICAL: Save suspicious frame ONLY if cheating detected
+    frame_saved = False
+    frame_path = duplicate_of = None
+    
+    if result['cheating_detected'] and 'frame' in result:
+        logger.info(f"🔍 Cheating detected for {student_id}, attempting to save frame...")
+        try:
+            frame_path, duplicate_of = save_suspicious_frame(
+                result['frame'],
+                result['reason'],
+                student_id
+            )
+            if frame_path:  # Only set to True if actually saved
+                frame_saved = True
+                logger.info(f"✅ Frame successfully saved: {frame_path}")
+            else:
+                logger.info(f"⏳ Frame not saved (waiting for persistence or cooldown)")
+        except Exception as e:
+            logger.error(f"❌ Error saving frame for {student_id}: {e}", exc_info=True)
+    elif result['cheating_detected'] and result['reason'] in EVIDENCE_REASONS:
+        # Raw grayscale frame - ask the client for a JPEG once evidence is due
+        result['evidence_requested'] = request_evidence(result['reason'], student_id)
+    
+    # Remove frame from response (it's binary data)
+    if 'frame' in result:
+        del result['frame']
+    
+    result['frame_saved'] = frame_saved
+    if frame_path:
+        result['frame_path'] = frame_path
+    if duplicate_of:
+        result['duplicate_of'] = duplicate_of  # no new image, frame_path is the earlier one
+    
+    live_status.update(str(session_id), student_key, result)
+    return result
+
 @app.route('/check-student', methods=['POST'])
 def check_student():
     """
@@ -438,13 +654,23 @@ def check_student():
         
         for frame_file in frames:
             filepath = os.path.join(student_folder, frame_file)
-            if os.path.isfile(filepath):
+            if frame_file != DUPLICATE_LOG and os.path.isfile(filepath):
                 frame_details.append({
                     'filename': frame_file,
                     'path': filepath,
                     'timestamp': frame_file.split('_')[1] if '_' in frame_file else 'unknown'
                 })
         
+        # Near-duplicate moments stored as references to an earlier frame
+        for reference in read_references(student_folder):
+            frame_details.append({
+                'filename': reference['duplicate_of'],
+                'path': os.path.join(student_folder, reference['duplicate_of']),
+                'timestamp': reference['timestamp'],
+                'reason': reference['reason'],
+                'duplicate': True
+            })
+        
         return jsonify({
             'student_id': student_id,
             'suspicious_activity_count': len(frame_details),
@@ -472,7 +698,175 @@ def get_frame(student_id, frame_name):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/session/<session_id>/status', methods=['GET'])
+def session_status(session_id):
+    """
+    Live status of every student in an exam session, served from memory
+    One call replaces a /check-student per student; no evidence folders are read.
+    """
+    status = live_status.session_status(session_id)
+    if status is None:
+        return jsonify({'error': 'No frames received for this session'}), 404
+    status['stale_after_seconds'] = LIVE_STATUS_STALE_SECONDS
+    return jsonify(status)
+
+@app.route('/session/<session_id>/events', methods=['GET'])
+def session_events(session_id):
+    """
+    Server-sent events feed of a session's live status
+    Sends a 'status' event with the whole session on every connection (reconnects
+    included, so nothing missed while disconnected or across a restart is lost),
+    then a 'change' event per student whose reason changes (or who appears).
+    A comment line is sent every few seconds to keep proxies open.
+    The stream ends after LIVE_STATUS_STREAM_SECONDS so it never holds a worker
+    for good; EventSource clients reconnect on their own.
+    """
+    if not LIVE_STATUS_EVENTS_ENABLED:
+        return jsonify({'error': 'Live status events are disabled'}), 404
+    
+    def event(name, version, payload):
+        return f"event: {name}\nid: {version}\ndata: {app.json.dumps(payload)}\n\n"
+    
+    def status_event():
+        status = live_status.session_status(session_id) or {
+            'session_id': session_id, 'version': live_status.version, 'students': []
+        }
+        return status['version'], event('status', status['version'], status)
+    
+    def generate():
+        ends_at = time.monotonic() + LIVE_STATUS_STREAM_SECONDS
+        yield "retry: 1000\n\n"  # reconnect a second after the stream ends
+        since, snapshot = status_event()
+        yield snapshot
+        
+        while True:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                return
+            timeout = min(LIVE_STATUS_KEEPALIVE_SECONDS, remaining)
+            since, changed, full = live_status.wait_for_changes(session_id, since, timeout)
+            if full:
+                # Changes were lost from the history: resend the whole session
+                since, snapshot = status_event()
+                yield snapshot
+                continue
+            if not changed:
+                yield ": keep-alive\n\n"
+            for student in changed:
+                yield event('change', since, student)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
+
+# Largest body a batch may have: MAX_BATCH_SIZE frames of MAX_FRAME_SIZE_MB plus form/JSON overhead
+MAX_FRAME_BYTES = MAX_FRAME_SIZE_MB * 1024 * 1024
+MAX_BATCH_BYTES = MAX_BATCH_SIZE * MAX_FRAME_BYTES + 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_BATCH_BYTES
+
+def limit_batch(frames):
+    """Pass frames through, failing as soon as the batch exceeds MAX_BATCH_SIZE"""
+    for count, frame in enumerate(frames, 1):
+        if count > MAX_BATCH_SIZE:
+            raise UploadTooLargeError(f'Batch exceeds {MAX_BATCH_SIZE} frames')
+        yield frame
+
+def iter_multipart_frames(parts):
+    """Frames from multipart parts: image files, or base64 'frames' fields"""
+    for part in parts:
+        data = part.data
+        if part.filename is None:
+            if part.name not in ('frame', 'frames'):
+                continue
+            try:
+                data = base64.b64decode(data, validate=True)
+            except ValueError:
+                raise FrameFormatError(f"Field '{part.name}' is not valid base64")
+        yield FrameRecord(FORMAT_JPEG, 0, 0, 0, np.frombuffer(data, np.uint8))
+
+def read_batch_request():
+    """
+    Open a batch upload. Returns (student_id, frames, detect); raises ValueError
+    for a bad request (UploadTooLargeError / FrameTooLargeError when over a limit).
+    
+    Binary and multipart bodies are read from the request stream one frame at a
+    time while `frames` is consumed, so only one frame is in memory at once.
+    JSON bodies are parsed whole and are only checked against the limits.
+    """
+    if request.content_length is not None and request.content_length > MAX_BATCH_BYTES:
+        raise UploadTooLargeError(f'Batch body exceeds {MAX_BATCH_BYTES // (1024 * 1024)}MB')
+    
+    student_id = request.headers.get('X-Student-Id') or request.args.get('student_id', 'unknown')
+    
+    if is_raw_frame_request():
+        frames = read_frames(request.stream, max_payload=MAX_FRAME_BYTES)
+        detect = detect_frame_record
+    elif request.mimetype == 'multipart/form-data':
+        boundary = request.mimetype_params.get('boundary')
+        if not boundary:
+            raise ValueError('Missing multipart boundary')
+        parts = iter_multipart(request.stream, boundary, max_part_size=MAX_FRAME_BYTES)
+        
+        # A student_id field may precede the frames
+        first = next(parts, None)
+        while first is not None and first.filename is None and first.name == 'student_id':
+            student_id = first.data.decode('utf-8', 'replace')
+            first = next(parts, None)
+        frames = iter_multipart_frames(itertools.chain([first] if first else [], parts))
+        detect = detect_frame_record
+    else:
+        data = request.json
+        frames = data.get('frames', [])
+        student_id = data.get('student_id', 'unknown')
+        detect = detect_face_and_validate
+        
+        if len(frames) > MAX_BATCH_SIZE:
+            raise UploadTooLargeError(f'Batch exceeds {MAX_BATCH_SIZE} frames')
+        if any(len(frame) > MAX_FRAME_BYTES for frame in frames):
+            raise UploadTooLargeError(f'Frame size exceeds {MAX_FRAME_SIZE_MB}MB limit')
+    
+    return student_id, limit_batch(frames), detect
+
+def batch_error_response(error):
+    """400 for malformed batches, 413 for batches over a size limit"""
+    if isinstance(error, (UploadTooLargeError, FrameTooLargeError, RequestEntityTooLarge)):
+        return jsonify({'error': str(error)}), 413
+    if isinstance(error, FrameFormatError):
+        return jsonify({'error': f'Invalid binary frame: {error}'}), 400
+    return jsonify({'error': str(error)}), 400
+
+def analyze_batch_frame(detect, frame, student_id, detector):
+    """
+    Detect one batch frame and save / request evidence
+    Returns (result, flagged) where flagged means evidence was saved or requested.
+    """
+    result = detect(frame, detector=detector)
+    flagged = False
+    
+    if result['cheating_detected'] and 'frame' in result:
+        try:
+            frame_path, duplicate_of = save_suspicious_frame(
+                result['frame'],
+                result['reason'],
+                student_id
+            )
+            result['frame_path'] = frame_path
+            if duplicate_of:
+                result['duplicate_of'] = duplicate_of
+            flagged = True
+        except Exception as e:
+            logger.error(f"❌ Error saving batch frame for {student_id}: {e}")
+    elif result['cheating_detected'] and result['reason'] in EVIDENCE_REASONS:
+        result['evidence_requested'] = request_evidence(result['reason'], student_id)
+        flagged = True
+    
+    if 'frame' in result:
+        del result['frame']
+    return result, flagged
+
 @app.route('/batch-analyze', methods=['POST'])
+@profiled
 def batch_analyze():
     """
     Analyze multiple frames in batch
@@ -482,48 +876,242 @@ def batch_analyze():
         'frames': [base64_frame1, base64_frame2, ...],
         'student_id': optional_student_identifier
     }
+    
+    or binary frames back to back (see frame_format), or multipart/form-data with
+    one image file (or base64 'frames' field) per part; for both the student id
+    travels in the X-Student-Id header (or a leading 'student_id' form field).
+    Binary and multipart frames are analyzed while the upload is still arriving.
     """
     try:
-        data = request.json
-        frames = data.get('frames', [])
-        student_id = data.get('student_id', 'unknown')
+        try:
+            student_id, frames, detect = read_batch_request()
+        except (ValueError, RequestEntityTooLarge) as e:
+            return batch_error_response(e)
         
-        if not frames:
-            return jsonify({'error': 'No frames provided'}), 400
+        detector = face_detector_for(student_id)
         
         results = []
+        total_frames = 0
         cheating_count = 0
+        skipped_count = 0
         
-        for idx, frame_b64 in enumerate(frames):
-            result = detect_face_and_validate(frame_b64)
-            
-            if result['cheating_detected'] and 'frame' in result:
+        try:
+            for idx, frame in enumerate(frames):
+                total_frames += 1
+                
+                # Batch frames are admitted one at a time at the lowest priority so live
+                # frames can overtake them; once overloaded the rest of the batch is skipped
+                if skipped_count or not admission.acquire(PRIORITY_BATCH):
+                    skipped_count += 1
+                    results.append({
+                        'frame_index': idx,
+                        'frame_skipped': True,
+                        'cheating_detected': False,
+                        'reason': 'server_overloaded'
+                    })
+                    continue
+                
                 try:
-                    frame_path = save_suspicious_frame(
-                        result['frame'],
-                        result['reason'],
-                        student_id
-                    )
-                    result['frame_path'] = frame_path
+                    result, flagged = analyze_batch_frame(detect, frame, student_id, detector)
+                finally:
+                    admission.release()
+                
+                if flagged:
                     cheating_count += 1
-                except Exception as e:
-                    print(f"Error saving frame: {e}")
-            
-            if 'frame' in result:
-                del result['frame']
-            
-            result['frame_index'] = idx
-            results.append(result)
+                result['frame_index'] = idx
+                results.append(result)
+        except (ValueError, RequestEntityTooLarge) as e:
+            logger.warning(f"Batch from {student_id} rejected after {total_frames} frames: {e}")
+            return batch_error_response(e)
+        
+        if not total_frames:
+            return jsonify({'error': 'No frames provided'}), 400
+        
+        if skipped_count == total_frames and OVERLOAD_RESPONSE != 'skip':
+            logger.warning(f"🚦 Overloaded, batch of {total_frames} frames from {student_id} not admitted")
+            return overload_response()
         
         return jsonify({
-            'total_frames': len(frames),
+            'total_frames': total_frames,
             'cheating_detected_count': cheating_count,
+            'skipped_count': skipped_count,
             'results': results
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def process_job_frame(job, frame):
+    """
+    Analyze one frame of a background batch job
+    Nobody is waiting on the connection, so an overloaded server delays the job
+    (live frames go first) instead of skipping its frames.
+    """
+    retry = False
+    while not admission.acquire(PRIORITY_BATCH, retry=retry):
+        if job.cancelled:
+            return {'frame_skipped': True, 'cheating_detected': False, 'reason': 'job_cancelled'}, False
+        time.sleep(RETRY_AFTER_SECONDS)
+        retry = True  # a waiting frame counts once in the overload counters
+    
+    try:
+        return analyze_batch_frame(job.detect, frame, job.student_id, face_detector_for(job.student_id))
+    finally:
+        admission.release()
+
+def batch_frame_size(frame):
+    """Memory held by a queued batch frame (binary FrameRecord or base64 string)"""
+    return frame.data.nbytes if isinstance(frame, FrameRecord) else len(frame)
+
+batch_jobs = BatchJobManager(
+    process_job_frame,
+    workers=BATCH_JOB_WORKERS,
+    max_jobs=BATCH_JOB_MAX_JOBS,
+    max_queued_bytes=BATCH_JOB_MAX_QUEUED_MB * 1024 * 1024,
+    frame_size=batch_frame_size,
+    ttl=BATCH_JOB_TTL_SECONDS,
+    logger=logger
+)
+
+@app.route('/batch-jobs', methods=['POST'])
+def submit_batch_job():
+    """
+    Queue a batch for background analysis (same body as /batch-analyze)
+    Returns 202 with the job id; poll /batch-jobs/<id> or stream /batch-jobs/<id>/results
+    """
+    try:
+        try:
+            student_id, frames, detect = read_batch_request()
+            # Reads the body into the job, within the queued-bytes budget
+            job = batch_jobs.submit(student_id, frames, detect)
+        except (ValueError, RequestEntityTooLarge) as e:
+            return batch_error_response(e)
+        except JobLimitError as e:
+            response = jsonify({'error': f'Too many batch jobs, retry later ({e})'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+            return response
+        
+        logger.info(f"📦 Batch job {job.id} queued: {job.total_frames} frames from {student_id}")
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'total_frames': job.total_frames,
+            'status_url': f'/batch-jobs/{job.id}',
+            'results_url': f'/batch-jobs/{job.id}/results'
+        }), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/batch-jobs/<job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """Progress of a batch job"""
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job.snapshot(batch_jobs.ttl))
+
+@app.route('/batch-jobs/<job_id>', methods=['DELETE'])
+def cancel_batch_job(job_id):
+    """Cancel a batch job (frames already analyzed keep their results)"""
+    job = batch_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job.snapshot(batch_jobs.ttl))
+
+@app.route('/batch-jobs/<job_id>/results', methods=['GET'])
+def stream_batch_job_results(job_id):
+    """
+    Stream job results as newline-delimited JSON, one line per frame as it finishes
+    ?offset=N resumes after the first N results. The stream ends when the job does.
+    """
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    offset = request.args.get('offset', 0, type=int)
+    
+    def generate():
+        for result in job.iter_results(offset):
+            # Blank lines keep idle connections open while frames wait for a slot
+            yield "\n" if result is None else app.json.dumps(result) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+# Set by a reverse proxy: the connection is local but the caller may not be
+PROXY_HEADERS = ('X-Forwarded-For', 'X-Real-IP', 'Forwarded')
+
+def admin_authorized():
+    """
+    Admin endpoints need X-Admin-Token, or a direct local caller when no token is configured
+    A request relayed by a proxy on the same host is never treated as local.
+    """
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+    if any(header in request.headers for header in PROXY_HEADERS):
+        return False
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """List available request profile dumps (newest first)"""
+    if not PROFILING_ENABLED:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        return jsonify({
+            'sample_rate': PROFILE_SAMPLE_RATE,
+            'max_files': PROFILE_MAX_FILES,
+            'profiles': profiler.list_profiles()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/profiles/<profile_name>', methods=['GET'])
+def get_profile(profile_name):
+    """Download a cProfile dump (open with pstats, snakeviz, etc.)"""
+    if not PROFILING_ENABLED:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 403
+    if not profiler.is_valid_name(profile_name):
+        return jsonify({'error': 'Invalid profile name'}), 400
+    
+    if not os.path.exists(os.path.join(PROFILE_DIR, profile_name)):
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    return send_from_directory(os.path.abspath(PROFILE_DIR), profile_name, as_attachment=True)
+
+def handle_local_frame(student_id, record, force_process, session_id=None):
+    """Analyze a frame received over the local socket transport"""
+    detect = lambda: detect_frame_record(record, detector=face_detector_for(student_id))
+    result = process_student_frame(detect, student_id, force_process, session_id or DEFAULT_SESSION)
+    return overload_result() if result is None else result
+
+def start_local_transport():
+    """
+    Serve frames over LOCAL_SOCKET_PATH, or 127.0.0.1:LOCAL_TCP_PORT (same pipeline as /analyze-frame)
+    The Unix socket is preferred; the loopback port is used where it is unavailable (Windows).
+    """
+    path = LOCAL_SOCKET_PATH if UNIX_SOCKETS_AVAILABLE else ''
+    if LOCAL_SOCKET_PATH and not path:
+        logger.warning("⚠️ LOCAL_SOCKET_PATH is set but Unix sockets are not supported here (set LOCAL_TCP_PORT)")
+    if not path and not LOCAL_TCP_PORT:
+        return None
+    
+    server = LocalFrameServer(
+        handle_local_frame,
+        path=path or None,
+        port=None if path else LOCAL_TCP_PORT,
+        max_payload=MAX_FRAME_BYTES,
+        logger=logger
+    )
+    server.start()
+    logger.info(f"🔌 Local frame transport listening on {server.address}")
+    return server
+
 if __name__ == '__main__':
     logger.info("="*60)
     logger.info("🚀 Starting Cheating Detection API")
@@ -541,6 +1129,12 @@ if __name__ == '__main__':
     logger.info("🔒 SECURITY: Screenshots ONLY saved when cheating detected")
     logger.info("="*60)
     
+    if LOCAL_SOCKET_PATH or LOCAL_TCP_PORT:
+        try:
+            start_local_transport()
+        except OSError as e:
+            logger.error(f"❌ Could not start local frame transport: {e}")
+    
     try:
         app.run(debug=DEBUG_MODE, host=HOST, port=PORT, threaded=True)
     except Exception as e:
@@ -0,0 +1,241 @@
+"""
+Asynchronous batch jobs
+Catch-up uploads are queued as jobs and analyzed on a small background pool, so
+the client gets a job id immediately instead of holding the connection open while
+every frame is analyzed. Results are kept per job and can be streamed as they are
+produced; finished jobs expire after a TTL.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_CANCELLED = 'cancelled'
+JOB_FAILED = 'failed'
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_CANCELLED, JOB_FAILED)
+
+
+class JobLimitError(Exception):
+    """Raised when too many jobs are already queued or running"""
+
+
+class BatchJob:
+    """One submitted batch: its frames (released as they are analyzed) and results"""
+
+    def __init__(self, student_id, frames, detect, frame_size=len):
+        self.id = uuid.uuid4().hex
+        self.student_id = student_id
+        self.detect = detect
+        self.total_frames = len(frames)
+        self.pending_bytes = sum(frame_size(frame) for frame in frames)
+        self.created = time.time()
+        self.finished = None
+        self.status = JOB_QUEUED
+        self.error = None
+        self.cheating_count = 0
+        self.skipped_count = 0
+        self.results = []
+
+        self._frames = frames
+        self._frame_size = frame_size
+        self._cond = threading.Condition()
+        self._cancelled = threading.Event()
+        self._future = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def take_frame(self, idx):
+        """Hand out frame `idx` and drop the job's reference to it"""
+        frame = self._frames[idx]
+        self._frames[idx] = None
+        self.pending_bytes -= self._frame_size(frame)
+        return frame
+
+    def add_result(self, result):
+        with self._cond:
+            self.results.append(result)
+            self._cond.notify_all()
+
+    def finish(self, status, error=None):
+        with self._cond:
+            self.status = status
+            self.error = error
+            self.finished = time.time()
+            self._frames = None
+            self.pending_bytes = 0
+            self._cond.notify_all()
+
+    def iter_results(self, start=0, poll_interval=15.0):
+        """
+        Yield results from index `start` as they are produced until the job finishes
+        Yields None every `poll_interval` seconds without progress (keep-alive).
+        """
+        idx = max(0, start)
+        while True:
+            with self._cond:
+                if idx >= len(self.results) and self.status not in FINISHED_STATES:
+                    self._cond.wait(poll_interval)
+                pending = self.results[idx:]
+                done = self.status in FINISHED_STATES
+            if pending:
+                idx += len(pending)
+                yield from pending
+            elif done:
+                return
+            else:
+                yield None
+
+    def snapshot(self, ttl):
+        with self._cond:
+            return {
+                'job_id': self.id,
+                'student_id': self.student_id,
+                'status': self.status,
+                'total_frames': self.total_frames,
+                'processed_frames': len(self.results),
+                'cheating_detected_count': self.cheating_count,
+                'skipped_count': self.skipped_count,
+                'error': self.error,
+                'created': self.created,
+                'finished': self.finished,
+                'expires_at': self.finished + ttl if self.finished else None
+            }
+
+
+class BatchJobManager:
+    """
+    Bounded background executor for batch jobs
+
+    - At most `workers` jobs run at once; at most `max_jobs` are queued or running
+    - Frames not analyzed yet may hold at most `max_queued_bytes` of memory in total
+      (measured with `frame_size`, 0 = no limit). Uploads reserve that budget frame by
+      frame while they are read, so an oversized batch is refused before it is in memory
+    - `process(job, frame)` analyzes one frame and returns (result, cheating), where
+      cheating means evidence was saved or requested (cheating_detected_count);
+      it is supplied by the API so jobs share its admission control and evidence
+      logic. Job frames are admitted at batch priority, after live frames
+    - Finished jobs are forgotten `ttl` seconds after they end
+    """
+
+    def __init__(self, process, workers=1, max_jobs=16, max_queued_bytes=0, frame_size=len, ttl=3600, logger=None):
+        self.process = process
+        self.max_jobs = max(1, max_jobs)
+        self.max_queued_bytes = max_queued_bytes
+        self.frame_size = frame_size
+        self.ttl = ttl
+        self.logger = logger
+
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='batch-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._reserved_bytes = 0  # frames of uploads still being read
+
+    def _check_jobs(self):
+        active = sum(1 for job in self._jobs.values() if job.status not in FINISHED_STATES)
+        if active >= self.max_jobs:
+            raise JobLimitError(f'{active} batch jobs already queued or running')
+
+    def _reserve(self, size, batch_bytes):
+        """Reserve queue memory for one more frame of an upload being read"""
+        mb = 1024 * 1024
+        with self._lock:
+            queued = self._reserved_bytes + sum(
+                job.pending_bytes for job in self._jobs.values() if job.status not in FINISHED_STATES
+            )
+            if self.max_queued_bytes and queued + size > self.max_queued_bytes:
+                raise JobLimitError(
+                    f'batch does not fit after {(batch_bytes + size) // mb}MB, '
+                    f'{(queued - batch_bytes) // mb}MB of {self.max_queued_bytes // mb}MB already queued'
+                )
+            self._reserved_bytes += size
+
+    def submit(self, student_id, frames, detect):
+        """
+        Read `frames` (any iterable, e.g. a streamed upload) and queue them as a job
+        Raises JobLimitError when the job or byte limits are reached, and ValueError
+        for an empty batch; errors of the iterable itself propagate.
+        """
+        self.expire()
+        with self._lock:
+            self._check_jobs()
+
+        queued, reserved = [], 0
+        try:
+            for frame in frames:
+                size = self.frame_size(frame)
+                self._reserve(size, reserved)
+                reserved += size
+                queued.append(frame)
+            if not queued:
+                raise ValueError('No frames provided')
+
+            job = BatchJob(student_id, queued, detect, self.frame_size)
+            with self._lock:
+                self._check_jobs()
+                self._jobs[job.id] = job
+        finally:
+            with self._lock:
+                self._reserved_bytes -= reserved  # now counted as the job's pending bytes
+        job._future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        self.expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Stop a job after its current frame. Returns the job or None if unknown."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job._cancelled.set()
+        if job._future is not None and job._future.cancel():
+            job.finish(JOB_CANCELLED)  # never started
+        return job
+
+    def expire(self):
+        """Forget finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job.finished is not None and job.finished < cutoff]:
+                del self._jobs[job_id]
+
+    def _run(self, job):
+        job.status = JOB_RUNNING
+        try:
+            for idx in range(job.total_frames):
+                if job.cancelled:
+                    job.finish(JOB_CANCELLED)
+                    return
+                result, cheating = self.process(job, job.take_frame(idx))
+                result['frame_index'] = idx
+                if cheating:
+                    job.cheating_count += 1
+                if result.get('frame_skipped'):
+                    job.skipped_count += 1
+                job.add_result(result)
+            job.finish(JOB_COMPLETED)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"❌ Batch job {job.id} failed: {e}", exc_info=True)
+            job.finish(JOB_FAILED, str(e))
+
+    def snapshot(self):
+        """Job counts for health checks"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            queued = self._reserved_bytes + sum(
+                job.pending_bytes for job in self._jobs.values() if job.status not in FINISHED_STATES
+            )
+            return {'jobs': counts, 'max_jobs': self.max_jobs,
+                    'queued_bytes': queued, 'max_queued_bytes': self.max_queued_bytes}
@@ -0,0 +1,135 @@
+"""
+Per-student face-scale calibration
+A student's face size barely changes during an exam, so after a few confident
+detections the detector only needs to search a narrow band of scales around it.
+Passing tight minSize/maxSize to detectMultiScale skips most pyramid levels.
+"""
+import threading
+from collections import OrderedDict
+
+from detection import DEFAULT_PARAMS, detect_faces, min_face_size
+
+
+class _StudentScale:
+    __slots__ = ('widths', 'bounds', 'frames_since_calibration', 'frames_since_full_scan')
+
+    def __init__(self):
+        self.widths = []
+        self.bounds = None
+        self.frames_since_calibration = 0
+        self.frames_since_full_scan = 0
+
+
+class ScaleCalibrator:
+    """
+    Learns each student's typical face width and narrows the detection scale range
+
+    - The first `samples` single-face detections (full scale range) are collected
+    - Their median width +/- `margin` becomes the student's minSize/maxSize
+    - Any frame that does not yield exactly one face inside the band is re-checked
+      over the full range and calibration starts over, so a lost face is never hidden
+    - A face outside the band (e.g. a second person further away or closer) cannot
+      be found by the narrowed search, so every `full_scan_frames`-th calibrated frame
+      is searched over the full range anyway; if it shows anything but one face,
+      calibration starts over and the following frames are searched in full until
+      the anomaly is gone. An extra person is therefore noticed within
+      `full_scan_frames` frames, not on the first frame they appear
+    - Calibration is also dropped every `relearn_frames` frames to follow slow drift
+
+    State is keyed by student, detection function and frame size: a client may switch
+    resolution (e.g. low-res raw frames and full-size evidence JPEGs), and the screen
+    and confirm tiers of tiered detection each learn from their own detections, so
+    downscaled screen boxes never enter the confirm tier's median and a confirmed
+    frame advances each tier's full-scan count once.
+    """
+
+    def __init__(self, samples=5, margin=0.4, relearn_frames=300, full_scan_frames=10, max_students=10000):
+        self.samples = max(1, samples)
+        self.margin = margin
+        self.relearn_frames = relearn_frames
+        self.full_scan_frames = full_scan_frames
+        self.max_students = max_students
+
+        self._lock = threading.Lock()
+        self._students = OrderedDict()  # {(student_key, detect, w, h): _StudentScale}
+
+    def detector_for(self, student_key, detect=detect_faces):
+        """
+        Return a detector callable (gray, params) -> faces bound to one student
+        `detect` is the underlying detection function (detect_faces, or the
+        screen_faces / confirm_faces tiers), all of which work in full-resolution pixels
+        """
+        return lambda gray, params=None: self.detect(student_key, gray, params, detect)
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._students.get(key)
+            if entry is None:
+                entry = self._students[key] = _StudentScale()
+                if len(self._students) > self.max_students:
+                    self._students.popitem(last=False)
+            else:
+                self._students.move_to_end(key)
+            return entry
+
+    def detect(self, student_key, gray, params=None, detect=detect_faces):
+        params = params or DEFAULT_PARAMS
+        h, w = gray.shape[:2]
+        entry = self._entry((student_key, detect, w, h))
+
+        bounds = entry.bounds
+        if bounds is not None:
+            with self._lock:
+                entry.frames_since_full_scan += 1
+                full_scan = bool(self.full_scan_frames) and entry.frames_since_full_scan >= self.full_scan_frames
+                if full_scan:
+                    entry.frames_since_full_scan = 0
+
+            if full_scan:
+                # Periodic full-range check for faces the band cannot see
+                faces = detect(gray, params)
+                if len(faces) != 1:
+                    with self._lock:
+                        entry.bounds = None
+                        entry.widths = []
+                return faces
+
+            faces = detect(gray, params, min_size=bounds[0], max_size=bounds[1])
+            if len(faces) == 1:
+                with self._lock:
+                    entry.frames_since_calibration += 1
+                    if self.relearn_frames and entry.frames_since_calibration >= self.relearn_frames:
+                        entry.bounds = None
+                return faces
+
+            # Anomaly inside the narrowed band - forget calibration and confirm on the full range
+            with self._lock:
+                entry.bounds = None
+                entry.widths = []
+
+        faces = detect(gray, params)
+        if len(faces) == 1:
+            self._learn(entry, int(faces[0][2]), w, h, params)
+        return faces
+
+    def _learn(self, entry, face_width, w, h, params):
+        with self._lock:
+            entry.widths.append(face_width)
+            if len(entry.widths) < self.samples:
+                return
+
+            widths = sorted(entry.widths)
+            median = widths[len(widths) // 2]
+            low = max(min_face_size(w, params)[0], int(median * (1 - self.margin)))
+            high = min(w, h, int(median * (1 + self.margin)) + 1)
+            if high > low:
+                entry.bounds = ((low, low), (high, high))
+                entry.frames_since_calibration = 0
+                entry.frames_since_full_scan = 0
+            entry.widths = []
+
+    def snapshot(self):
+        """Calibration counts for health checks"""
+        with self._lock:
+            calibrated = sum(1 for entry in self._students.values() if entry.bounds is not None)
+            return {'tracked': len(self._students), 'calibrated': calibrated}
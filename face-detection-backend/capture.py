@@ -0,0 +1,147 @@
+"""
+Frame traffic capture for replay testing
+Records incoming /analyze-frame requests exactly as they arrived (student, time,
+content type, query string, session header, raw body) together with the verdict
+and latency the server produced, so scripts/replay_capture.py can feed real
+traffic back through the app.
+
+A capture file is a sequence of records, each a 28-byte little-endian header
+followed by the variable-length fields:
+
+    magic           4 bytes   b'GLC2'
+    timestamp       float64   unix time the request arrived
+    latency_ms      float32   time the server took to answer
+    student length  uint16
+    type length     uint8     content type length
+    reason length   uint8     verdict ('reason' of the response) length
+    body length     uint32
+    query length    uint16    query string (e.g. force_process=true)
+    session length  uint16    X-Session-Id header
+    student id, content type, reason, query string, session id (utf-8),
+    body (raw request bytes)
+
+Files of the earlier GLC1 records (the same without query string and session)
+can still be read.
+
+Records are appended with a single write, so a capture interrupted mid-request
+at worst ends with one truncated record, which readers ignore.
+"""
+import os
+import struct
+import threading
+
+CAPTURE_MAGIC = b'GLC2'
+CAPTURE_MAGIC_V1 = b'GLC1'
+CAPTURE_HEADER = struct.Struct('<4sdfHBBI')
+CAPTURE_EXTRA = struct.Struct('<HH')  # GLC2 only: query string and session id lengths
+
+
+class CaptureRecord:
+    """One captured request"""
+
+    __slots__ = ('timestamp', 'latency_ms', 'student_id', 'content_type', 'reason', 'body',
+                 'query_string', 'session_id')
+
+    def __init__(self, timestamp, latency_ms, student_id, content_type, reason, body,
+                 query_string='', session_id=''):
+        self.timestamp = timestamp
+        self.latency_ms = latency_ms
+        self.student_id = student_id
+        self.content_type = content_type
+        self.reason = reason
+        self.body = body
+        self.query_string = query_string
+        self.session_id = session_id
+
+
+class FrameRecorder:
+    """Appends captured requests to a file until it reaches `max_bytes`"""
+
+    def __init__(self, path, max_bytes, logger=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab')
+        self.size = self._file.tell()
+        self.records = 0
+        self.full = False
+
+    def record(self, timestamp, latency_ms, student_id, content_type, reason, body,
+               query_string='', session_id=''):
+        student = str(student_id).encode('utf-8')[:0xFFFF]
+        ctype = (content_type or '').encode('utf-8')[:0xFF]
+        verdict = (reason or '').encode('utf-8')[:0xFF]
+        query = (query_string or '').encode('utf-8')[:0xFFFF]
+        session = (session_id or '').encode('utf-8')[:0xFFFF]
+        data = b''.join((
+            CAPTURE_HEADER.pack(CAPTURE_MAGIC, timestamp, latency_ms, len(student), len(ctype), len(verdict), len(body)),
+            CAPTURE_EXTRA.pack(len(query), len(session)),
+            student, ctype, verdict, query, session, body
+        ))
+
+        with self._lock:
+            if self.full:
+                return False
+            if self.max_bytes and self.size + len(data) > self.max_bytes:
+                self.full = True
+                if self.logger:
+                    self.logger.warning(f"⚠️ Capture file {self.path} reached its size limit, recording stopped")
+                return False
+            self._file.write(data)
+            self._file.flush()
+            self.size += len(data)
+            self.records += 1
+            return True
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def snapshot(self):
+        """Capture progress for health checks"""
+        with self._lock:
+            return {'path': self.path, 'records': self.records, 'bytes': self.size, 'full': self.full}
+
+
+def iter_capture(path):
+    """Yield every complete CaptureRecord in a capture file"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(CAPTURE_HEADER.size)
+            if len(header) < CAPTURE_HEADER.size:
+                return
+            magic, timestamp, latency_ms, student_len, ctype_len, reason_len, body_len = CAPTURE_HEADER.unpack(header)
+            query_len = session_len = 0
+            if magic == CAPTURE_MAGIC:
+                extra = f.read(CAPTURE_EXTRA.size)
+                if len(extra) < CAPTURE_EXTRA.size:
+                    return
+                query_len, session_len = CAPTURE_EXTRA.unpack(extra)
+            elif magic != CAPTURE_MAGIC_V1:
+                raise ValueError(f'Invalid capture record at offset {f.tell() - CAPTURE_HEADER.size}')
+
+            size = student_len + ctype_len + reason_len + query_len + session_len + body_len
+            fields = f.read(size)
+            if len(fields) < size:
+                return  # truncated last record
+
+            student_end = student_len
+            ctype_end = student_end + ctype_len
+            reason_end = ctype_end + reason_len
+            query_end = reason_end + query_len
+            session_end = query_end + session_len
+            yield CaptureRecord(
+                timestamp,
+                latency_ms,
+                fields[:student_end].decode('utf-8', 'replace'),
+                fields[student_end:ctype_end].decode('utf-8', 'replace'),
+                fields[ctype_end:reason_end].decode('utf-8', 'replace'),
+                fields[session_end:],
+                fields[reason_end:query_end].decode('utf-8', 'replace'),
+                fields[query_end:session_end].decode('utf-8', 'replace')
+            )
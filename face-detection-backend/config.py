@@ -16,28 +16,110 @@ LOG_DIR = os.getenv('LOG_DIR', 'logs')
 # Face Detection Thresholds
 FACE_CONFIDENCE_THRESHOLD = float(os.getenv('FACE_CONFIDENCE_THRESHOLD', '0.5'))
 FACE_VISIBILITY_THRESHOLD = float(os.getenv('FACE_VISIBILITY_THRESHOLD', '0.08'))  # 8% minimum - very lenient for normal use
+FACE_COVERAGE_OVERRIDE = float(os.getenv('FACE_COVERAGE_OVERRIDE', '0.05'))  # faces covering at least 5% and not at an edge are always OK
 EDGE_MARGIN_PIXELS = int(os.getenv('EDGE_MARGIN_PIXELS', '5'))  # Distance from frame edge to consider "out of frame"
+REFERENCE_FRAME_WIDTH = int(os.getenv('REFERENCE_FRAME_WIDTH', '640'))  # MIN_FACE_SIZE and EDGE_MARGIN_PIXELS apply at this width; narrower frames scale them down
 
 # Performance & Rate Limiting
 FRAME_SAVE_COOLDOWN = int(os.getenv('FRAME_SAVE_COOLDOWN', '5'))  # seconds between saving frames for same student
 MIN_SUSPICIOUS_DURATION = int(os.getenv('MIN_SUSPICIOUS_DURATION', '1'))  # seconds - only save if issue persists (reduced to 1 for better responsiveness)
+EVIDENCE_REQUEST_TIMEOUT = float(os.getenv('EVIDENCE_REQUEST_TIMEOUT', '3'))  # seconds a raw-frame client has to send the requested JPEG before it is asked again
 FRAME_PROCESS_INTERVAL = int(os.getenv('FRAME_PROCESS_INTERVAL', '1'))  # process every Nth frame (1=all frames)
 # Set to 1 for reliable detection. If system overheats, increase to 2 or 3
 
+# Execution Plan (cores, cgroup quota and OpenCV threading - see scripts/calibrate_execution.py)
+DETECTION_WORKERS = int(os.getenv('DETECTION_WORKERS', '0'))  # frames analyzed in parallel (0 = one per usable core)
+OPENCV_THREADS = int(os.getenv('OPENCV_THREADS', '0'))  # OpenCV threads per detection (0 = usable cores / workers)
+PIN_CPU_CORES = os.getenv('PIN_CPU_CORES', 'False').lower() == 'true'  # restrict the process to the planned cores
+SERVER_PROCESSES = int(os.getenv('SERVER_PROCESSES', os.getenv('WEB_CONCURRENCY', '1')))  # API processes sharing the CPUs (gunicorn -w); each plans for its share
+
+# Admission Control (backpressure when the server falls behind)
+MAX_CONCURRENT_DETECTIONS = int(os.getenv('MAX_CONCURRENT_DETECTIONS', '0'))  # frames analyzed at once (0 = planned detection workers)
+MAX_PENDING_FRAMES = int(os.getenv('MAX_PENDING_FRAMES', '32'))  # frames allowed to wait for a detection slot
+ADMISSION_WAIT_TIMEOUT = float(os.getenv('ADMISSION_WAIT_TIMEOUT', '2.0'))  # seconds a frame may wait before being rejected
+CALM_QUEUE_SHARE = float(os.getenv('CALM_QUEUE_SHARE', '0.5'))  # share of the queue open to calm students (flagged students get the rest)
+OVERLOAD_RESPONSE = os.getenv('OVERLOAD_RESPONSE', 'reject').lower()  # reject (503 + Retry-After) or skip (degraded 200)
+RETRY_AFTER_SECONDS = int(os.getenv('RETRY_AFTER_SECONDS', '1'))
+
+# Shared State (cooldown / persistence tracking across workers and nodes)
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory').lower()  # memory (single process), sqlite (multi-process), redis (multi-node)
+STATE_LOCK_STRIPES = int(os.getenv('STATE_LOCK_STRIPES', '64'))  # lock shards for the memory backend
+STATE_DB_PATH = os.getenv('STATE_DB_PATH', os.path.join('state', 'student_state.db'))  # used by sqlite backend
+STATE_DB_POOL_SIZE = int(os.getenv('STATE_DB_POOL_SIZE', '4'))  # max SQLite connections per process
+STATE_REDIS_URL = os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/0')  # used by redis backend
+STATE_KEY_PREFIX = os.getenv('STATE_KEY_PREFIX', 'gradelink')
+STATE_TTL_SECONDS = int(os.getenv('STATE_TTL_SECONDS', '21600'))  # redis keys expire after 6h of inactivity
+
 # Detection Parameters
-MIN_FACE_SIZE = (40, 40)  # Minimum face size to detect in pixels
+MIN_FACE_SIZE = (40, 40)  # Minimum face size to detect in pixels (at REFERENCE_FRAME_WIDTH)
 SCALE_FACTOR = 1.1  # How much the image size is reduced at each image scale (lower = more accurate but slower)
 MIN_NEIGHBORS = 3  # How many neighbors each candidate rectangle should have (lower = more detections, may have false positives)
 
+# Evidence Retention (background cleanup of SUSPICIOUS_FRAMES_DIR; 0 disables a policy)
+RETENTION_ENABLED = os.getenv('RETENTION_ENABLED', 'True').lower() == 'true'
+RETENTION_MAX_AGE_DAYS = float(os.getenv('RETENTION_MAX_AGE_DAYS', '0'))  # delete evidence older than this
+RETENTION_MAX_TOTAL_MB = int(os.getenv('RETENTION_MAX_TOTAL_MB', '0'))  # cap on total evidence size
+RETENTION_MAX_FILES_PER_STUDENT = int(os.getenv('RETENTION_MAX_FILES_PER_STUDENT', '0'))  # keep newest N frames per student
+MIN_FREE_DISK_MB = int(os.getenv('MIN_FREE_DISK_MB', '500'))  # new frames are not written below this much free disk
+RETENTION_FREE_DISK_MB = int(os.getenv('RETENTION_FREE_DISK_MB', '0'))  # delete old evidence to keep this much disk free (0 = never)
+RETENTION_PROTECT_HOURS = float(os.getenv('RETENTION_PROTECT_HOURS', '24'))  # evidence younger than this is never deleted for free space
+RETENTION_INTERVAL_SECONDS = int(os.getenv('RETENTION_INTERVAL_SECONDS', '600'))
+
+# Evidence Deduplication (near-identical empty-chair frames are stored as references to an earlier frame)
+EVIDENCE_DEDUP_ENABLED = os.getenv('EVIDENCE_DEDUP_ENABLED', 'True').lower() == 'true'
+EVIDENCE_DEDUP_MAX_DISTANCE = int(os.getenv('EVIDENCE_DEDUP_MAX_DISTANCE', '8'))  # differing hash bits (of 256) still counted as the same picture
+EVIDENCE_DEDUP_WINDOW_SECONDS = int(os.getenv('EVIDENCE_DEDUP_WINDOW_SECONDS', '300'))  # a full frame is saved again at least this often
+
+# Per-student Face-scale Calibration (narrows the detection pyramid once a student's face size is known)
+SCALE_CALIBRATION_ENABLED = os.getenv('SCALE_CALIBRATION_ENABLED', 'True').lower() == 'true'
+SCALE_CALIBRATION_SAMPLES = int(os.getenv('SCALE_CALIBRATION_SAMPLES', '5'))  # confident detections before narrowing
+SCALE_CALIBRATION_MARGIN = float(os.getenv('SCALE_CALIBRATION_MARGIN', '0.4'))  # +/- 40% around the typical face width
+SCALE_RECALIBRATION_FRAMES = int(os.getenv('SCALE_RECALIBRATION_FRAMES', '300'))  # re-learn the full range after N frames
+SCALE_FULL_SCAN_FRAMES = int(os.getenv('SCALE_FULL_SCAN_FRAMES', '10'))  # search the full range every Nth calibrated frame for faces outside the band (0 = never)
+
+# Two-tier Detection (cheap low-resolution screening, full-resolution confirmation of anomalies)
+TIERED_DETECTION_ENABLED = os.getenv('TIERED_DETECTION_ENABLED', 'True').lower() == 'true'
+SCREEN_WIDTH = int(os.getenv('SCREEN_WIDTH', '320'))  # frames are downscaled to this width for screening
+SCREEN_SCALE_FACTOR = float(os.getenv('SCREEN_SCALE_FACTOR', '1.2'))  # coarser pyramid for screening
+CONFIRM_MIN_NEIGHBORS = int(os.getenv('CONFIRM_MIN_NEIGHBORS', '6'))  # extra faces must survive this before "multiple faces" is reported
+
+# Live Status (in-memory latest verdict per session/student for /session/<id>/status)
+LIVE_STATUS_STALE_SECONDS = int(os.getenv('LIVE_STATUS_STALE_SECONDS', '15'))  # students silent this long are reported offline
+LIVE_STATUS_TTL_SECONDS = int(os.getenv('LIVE_STATUS_TTL_SECONDS', '21600'))  # sessions idle this long are dropped
+LIVE_STATUS_EVENTS_ENABLED = os.getenv('LIVE_STATUS_EVENTS_ENABLED', 'True').lower() == 'true'  # /session/<id>/events SSE feed
+LIVE_STATUS_STREAM_SECONDS = int(os.getenv('LIVE_STATUS_STREAM_SECONDS', '60'))  # an events stream is closed after this long; clients reconnect with Last-Event-ID
+
 # Logging Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # DEBUG, INFO, WARNING, ERROR, CRITICAL
 LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', '10485760'))  # 10MB
 LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
 
+# Profiling (opt-in; zero cost when disabled)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILE_SAMPLE_RATE = int(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # profile 1 in N frame requests (0 = only on request via X-Profile header)
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))  # oldest dumps are deleted beyond this
+
+# Traffic Capture (record /analyze-frame requests for scripts/replay_capture.py)
+CAPTURE_ENABLED = os.getenv('CAPTURE_ENABLED', 'False').lower() == 'true'
+CAPTURE_PATH = os.getenv('CAPTURE_PATH', os.path.join('captures', 'frames.glc'))
+CAPTURE_MAX_MB = int(os.getenv('CAPTURE_MAX_MB', '1024'))  # recording stops when the file reaches this size (0 = no limit)
+
 # Security Configuration
 MAX_FRAME_SIZE_MB = int(os.getenv('MAX_FRAME_SIZE_MB', '5'))
 MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '100'))
 ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', '*')  # CORS origins
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # required in X-Admin-Token for /admin endpoints (empty = direct localhost callers only, never via a proxy)
+
+# Batch Jobs (asynchronous /batch-jobs uploads)
+BATCH_JOB_WORKERS = int(os.getenv('BATCH_JOB_WORKERS', '1'))  # jobs analyzed at the same time
+BATCH_JOB_MAX_JOBS = int(os.getenv('BATCH_JOB_MAX_JOBS', '16'))  # jobs allowed to be queued or running
+BATCH_JOB_MAX_QUEUED_MB = int(os.getenv('BATCH_JOB_MAX_QUEUED_MB', '512'))  # memory all queued, not yet analyzed job frames may use (0 = no limit)
+BATCH_JOB_TTL_SECONDS = int(os.getenv('BATCH_JOB_TTL_SECONDS', '3600'))  # how long finished job results are kept
+
+# Local Transport (Unix socket for a desktop client on the same machine)
+LOCAL_SOCKET_PATH = os.getenv('LOCAL_SOCKET_PATH', '')  # e.g. /tmp/gradelink-detection.sock (empty = disabled)
+LOCAL_TCP_PORT = int(os.getenv('LOCAL_TCP_PORT', '0'))  # serve the local transport on 127.0.0.1 instead, e.g. on Windows (0 = disabled)
 
 # Directory Creation
 def ensure_directories():
@@ -56,5 +138,12 @@ def get_config_summary():
         'frame_save_cooldown': FRAME_SAVE_COOLDOWN,
         'min_suspicious_duration': MIN_SUSPICIOUS_DURATION,
         'frame_process_interval': FRAME_PROCESS_INTERVAL,
+        'max_concurrent_detections': MAX_CONCURRENT_DETECTIONS,
+        'max_pending_frames': MAX_PENDING_FRAMES,
+        'overload_response': OVERLOAD_RESPONSE,
+        'state_backend': STATE_BACKEND,
+        'profiling_enabled': PROFILING_ENABLED,
+        'scale_calibration_enabled': SCALE_CALIBRATION_ENABLED,
+        'tiered_detection_enabled': TIERED_DETECTION_ENABLED,
         'log_level': LOG_LEVEL
     }
@@ -0,0 +1,354 @@
+"""
+Face detection and visibility validation
+Shared by the API and the offline tools in scripts/ so they apply exactly the same rules
+"""
+import base64
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from config import (
+    FACE_VISIBILITY_THRESHOLD, FACE_COVERAGE_OVERRIDE, EDGE_MARGIN_PIXELS,
+    REFERENCE_FRAME_WIDTH, MIN_FACE_SIZE, SCALE_FACTOR, MIN_NEIGHBORS,
+    SCREEN_WIDTH, SCREEN_SCALE_FACTOR, CONFIRM_MIN_NEIGHBORS
+)
+from frame_format import FORMAT_JPEG, FORMAT_BGR8
+
+# Detection parameters from config; offline tools pass their own copy to try new values
+DEFAULT_PARAMS = {
+    'scale_factor': SCALE_FACTOR,
+    'min_neighbors': MIN_NEIGHBORS,
+    'min_face_size': MIN_FACE_SIZE,
+    'visibility_threshold': FACE_VISIBILITY_THRESHOLD,
+    'coverage_override': FACE_COVERAGE_OVERRIDE,
+    'edge_margin': EDGE_MARGIN_PIXELS,
+    'reference_width': REFERENCE_FRAME_WIDTH,
+    'screen_width': SCREEN_WIDTH,
+    'screen_scale_factor': SCREEN_SCALE_FACTOR,
+    'confirm_min_neighbors': CONFIRM_MIN_NEIGHBORS
+}
+
+# Screening only clears faces that pass the visibility rules by this margin,
+# since boxes found at low resolution are only accurate to a few pixels
+SCREEN_SAFETY_FACTOR = 1.15
+
+face_cascade = None
+
+def init_detector():
+    """Load the pre-trained face detector (once per process)"""
+    global face_cascade
+    if face_cascade is None:
+        cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+        if cascade.empty():
+            raise RuntimeError("Face cascade classifier not loaded")
+        face_cascade = cascade
+    return face_cascade
+
+# Detection reasons that warrant saving evidence (decode errors do not)
+EVIDENCE_REASONS = (
+    'face_not_detected', 'multiple_faces_detected', 'face_out_of_frame', 'face_partially_visible'
+)
+
+def frame_scale(w, params=None):
+    """
+    Factor applied to min_face_size and edge_margin for a frame `w` pixels wide
+    Both are set for params['reference_width']; narrower frames (e.g. downscaled
+    raw uploads) use proportionally smaller values, wider frames the values as set.
+    """
+    params = params or DEFAULT_PARAMS
+    return min(1.0, w / params['reference_width'])
+
+def min_face_size(w, params=None):
+    """Smallest face searched for in a frame `w` pixels wide (see frame_scale)"""
+    params = params or DEFAULT_PARAMS
+    scale = frame_scale(w, params)
+    size = params['min_face_size']
+    return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+def detect_faces(gray, params=None, min_size=None, max_size=None):
+    """
+    Run the face detector on a grayscale image. Returns an array of (x, y, w, h) boxes
+    `min_size`/`max_size` narrow the searched scales (see calibration.py)
+    """
+    params = params or DEFAULT_PARAMS
+    
+    # Detect faces (balanced for performance and accuracy)
+    return face_cascade.detectMultiScale(
+        gray,
+        scaleFactor=params['scale_factor'],
+        minNeighbors=params['min_neighbors'],
+        minSize=min_size or min_face_size(gray.shape[1], params),
+        maxSize=max_size or (0, 0)
+    )
+
+def screen_faces(gray, params=None, min_size=None, max_size=None):
+    """
+    Cheap detection on a copy downscaled to params['screen_width'] with a coarser
+    pyramid. Sizes and returned boxes are in full-resolution pixels, so this is a
+    drop-in replacement for detect_faces (faces too small for the downscaled
+    image are simply not found, which makes screening fall back to confirmation)
+    """
+    params = params or DEFAULT_PARAMS
+    h, w = gray.shape[:2]
+    scale = params['screen_width'] / w
+    if scale >= 1:
+        return detect_faces(gray, params, min_size, max_size)
+    
+    small = cv2.resize(gray, (params['screen_width'], max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    shrink = lambda size: (max(1, int(size[0] * scale)), max(1, int(size[1] * scale)))
+    faces = face_cascade.detectMultiScale(
+        small,
+        scaleFactor=params['screen_scale_factor'],
+        minNeighbors=params['min_neighbors'],
+        minSize=shrink(min_size or min_face_size(w, params)),
+        maxSize=shrink(max_size) if max_size else (0, 0)
+    )
+    if len(faces) == 0:
+        return faces
+    return np.round(np.asarray(faces) / scale).astype(np.int32)
+
+def confirm_faces(gray, params=None, min_size=None, max_size=None):
+    """
+    Full-resolution detection for frames screening could not clear
+    When several faces are found, only faces that also survive the stricter
+    params['confirm_min_neighbors'] are kept, so weak background detections do not
+    raise "multiple faces" alarms
+    """
+    params = params or DEFAULT_PARAMS
+    faces = detect_faces(gray, params, min_size, max_size)
+    if len(faces) <= 1 or params['confirm_min_neighbors'] <= params['min_neighbors']:
+        return faces
+    
+    strict = detect_faces(gray, dict(params, min_neighbors=params['confirm_min_neighbors']), min_size, max_size)
+    return strict if len(strict) else faces
+
+def screen_clears(faces, w, h, params=None):
+    """True if screened boxes show one face that is clearly OK (no confirmation needed)"""
+    if len(faces) != 1:
+        return False
+    params = params or DEFAULT_PARAMS
+    # The screening error is in real pixels, so it is added before classify_faces scales the margin
+    strict = dict(
+        params,
+        visibility_threshold=params['visibility_threshold'] * SCREEN_SAFETY_FACTOR,
+        coverage_override=params['coverage_override'] * SCREEN_SAFETY_FACTOR,
+        edge_margin=params['edge_margin'] + np.ceil(w / params['screen_width']) / frame_scale(w, params)
+    )
+    return not classify_faces(faces, w, h, strict)['cheating_detected']
+
+def classify_faces(faces, w, h, params=None):
+    """
+    Apply the visibility and edge rules to detected face boxes in a w x h frame
+    (scripts/threshold_sweep.py mirrors these rules in vectorized form)
+    The edge margin is scaled to the frame width (see frame_scale)
+    Returns: {
+        'face_detected': bool,
+        'fully_visible': bool,
+        'face_coverage': float (0-1),
+        'face_location': (x, y, w, h) or None,
+        'cheating_detected': bool,
+        'reason': str
+    }
+    """
+    params = params or DEFAULT_PARAMS
+    edge_margin = params['edge_margin'] * frame_scale(w, params)
+    frame_area = h * w
+    
+    # No face detected
+    if len(faces) == 0:
+        return {
+            'face_detected': False,
+            'fully_visible': False,
+            'cheating_detected': True,
+            'reason': 'face_not_detected',
+            'face_coverage': 0
+        }
+    
+    # Multiple faces detected (cheating attempt)
+    if len(faces) > 1:
+        return {
+            'face_detected': True,
+            'fully_visible': False,
+            'cheating_detected': True,
+            'reason': 'multiple_faces_detected',
+            'face_coverage': 0,
+            'face_count': len(faces)
+        }
+    
+    # Single face detected - validate visibility
+    x, y, face_w, face_h = faces[0]
+    face_area = face_w * face_h
+    face_coverage = face_area / frame_area
+    
+    # Check if face is at frame edges (partially out of frame)
+    # More lenient edge detection - only flag if truly at edge
+    is_at_edge = (x < edge_margin or 
+                  y < edge_margin or 
+                  (x + face_w) > (w - edge_margin) or 
+                  (y + face_h) > (h - edge_margin))
+    
+    # Much more lenient visibility check
+    # Only flag if face is REALLY small (far away) or actually out of frame
+    is_fully_visible = (
+        face_coverage >= params['visibility_threshold'] and 
+        not is_at_edge
+    )
+    
+    # Additional check: If face coverage is reasonable (>5%), consider it OK even if at edge slightly
+    # This prevents false positives for normal sitting positions
+    if face_coverage >= params['coverage_override'] and not is_at_edge:
+        is_fully_visible = True
+    
+    return {
+        'face_detected': True,
+        'fully_visible': bool(is_fully_visible),
+        'face_coverage': float(face_coverage),
+        'face_location': {'x': int(x), 'y': int(y), 'w': int(face_w), 'h': int(face_h)},
+        'cheating_detected': not bool(is_fully_visible),
+        'reason': 'ok' if is_fully_visible else ('face_out_of_frame' if is_at_edge else 'face_partially_visible')
+    }
+
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+class GrayBufferPool:
+    """
+    Grayscale scratch images for raw BGR frames, shared by all request threads
+    
+    A buffer is taken for one detection and handed back afterwards, so the pool
+    never holds more buffers than frames analyzed at once. The API sizes it to its
+    admission slots; buffers beyond `max_free` are dropped instead of kept.
+    """
+    
+    def __init__(self, max_free=4):
+        self.max_free = max_free
+        self._lock = threading.Lock()
+        self._free = []
+    
+    @contextmanager
+    def buffer(self, shape):
+        """Borrow a uint8 image of `shape`, reusing a returned one of the same size"""
+        buffer = None
+        with self._lock:
+            for idx, candidate in enumerate(self._free):
+                if candidate.shape == shape:
+                    buffer = self._free.pop(idx)
+                    break
+        if buffer is None:
+            buffer = np.empty(shape, np.uint8)
+        try:
+            yield buffer
+        finally:
+            with self._lock:
+                self._free.append(buffer)
+                if len(self._free) > self.max_free:
+                    self._free.pop(0)  # oldest, most likely of a size no longer sent
+    
+    def snapshot(self):
+        with self._lock:
+            return {'free': len(self._free), 'max_free': self.max_free}
+
+gray_buffers = GrayBufferPool()
+
+class EvidenceFrame:
+    """
+    What a suspicious verdict needs to save evidence: the image exactly as it was
+    uploaded (encoded bytes) and its grayscale version (for duplicate detection)
+    """
+    
+    __slots__ = ('encoded', 'gray')
+    
+    def __init__(self, encoded, gray):
+        self.encoded = encoded
+        self.gray = gray
+    
+    def write(self, path):
+        """Write the evidence image. JPEG uploads are stored byte for byte, without re-encoding"""
+        if self.encoded[:3].tobytes() == JPEG_MAGIC:
+            with open(path, 'wb') as f:
+                f.write(self.encoded)
+            return True
+        
+        frame = cv2.imdecode(self.encoded, cv2.IMREAD_COLOR)
+        return frame is not None and cv2.imwrite(path, frame)
+
+def analyze_gray(gray, evidence=None, params=None, detector=None):
+    """
+    Detect face in a grayscale image and validate visibility (see classify_faces)
+    `evidence` (an EvidenceFrame) is attached to the result as 'frame' only when
+    the verdict is suspicious, so OK frames are released right after detection
+    (raw grayscale uploads have none)
+    `params` overrides DEFAULT_PARAMS (used when re-analyzing with new thresholds)
+    `detector` replaces detect_faces, e.g. a per-student calibrated detector
+    """
+    h, w = gray.shape[:2]
+    faces = (detector or detect_faces)(gray, params)
+    result = classify_faces(faces, w, h, params)
+    
+    if evidence is not None and result['cheating_detected']:
+        result['frame'] = evidence
+    return result
+
+def invalid_frame_result(reason='invalid_frame'):
+    """Result for frames that could not be decoded"""
+    return {
+        'face_detected': False,
+        'fully_visible': False,
+        'cheating_detected': True,
+        'reason': reason,
+        'face_coverage': 0
+    }
+
+def decode_gray(nparr):
+    """Decode an encoded image (uint8 array) straight to grayscale, None if undecodable"""
+    return cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+
+def record_gray(record, dst=None):
+    """
+    Grayscale image of a binary frame record (None if its JPEG cannot be decoded)
+    BGR frames are converted into `dst` when given (see GrayBufferPool)
+    """
+    if record.format == FORMAT_JPEG:
+        return decode_gray(record.data)
+    if record.format == FORMAT_BGR8:
+        return cv2.cvtColor(record.data, cv2.COLOR_BGR2GRAY, dst=dst)
+    return record.data
+
+def detect_encoded_frame(nparr, params=None, detector=None):
+    """
+    Decode an encoded image (JPEG/PNG bytes as a uint8 array) and analyze it
+    The image is decoded straight to grayscale; no color copy is made, since
+    evidence is written from the original bytes.
+    """
+    gray = decode_gray(nparr)
+    
+    if gray is None:
+        return invalid_frame_result()
+    
+    return analyze_gray(gray, EvidenceFrame(nparr, gray), params, detector)
+
+def detect_face_and_validate(frame_data, params=None, detector=None):
+    """Detect face in a base64 encoded frame and validate visibility (see analyze_gray)"""
+    try:
+        # Convert base64 to image
+        nparr = np.frombuffer(base64.b64decode(frame_data), np.uint8)
+        return detect_encoded_frame(nparr, params, detector)
+    except Exception as e:
+        return invalid_frame_result(f'error: {str(e)}')
+
+def detect_frame_record(record, params=None, detector=None):
+    """Analyze a binary frame (see frame_format) without any codec work for raw pixels"""
+    try:
+        if record.format == FORMAT_JPEG:
+            return detect_encoded_frame(record.data, params, detector)
+        if record.format == FORMAT_BGR8:
+            # Raw frames carry no evidence image, so the buffer is free again after detection
+            with gray_buffers.buffer(record.data.shape[:2]) as dst:
+                return analyze_gray(record_gray(record, dst), params=params, detector=detector)
+        
+        return analyze_gray(record_gray(record), params=params, detector=detector)
+    except Exception as e:
+        return invalid_frame_result(f'error: {str(e)}')
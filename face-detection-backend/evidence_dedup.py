@@ -0,0 +1,143 @@
+"""
+Near-duplicate evidence detection
+A long absence (an empty chair for ten minutes) produces a stream of almost
+identical frames. Each frame gets a 256-bit difference hash; a frame that is close
+to one of the student's recently saved frames is recorded as a reference line in
+the student's duplicates log instead of a new JPEG, so the timeline is kept
+without writing the same picture again.
+
+Only DEDUP_REASONS are deduplicated. The hash is dominated by the background, so
+a second person at the side or a phone held up changes only a few bits; frames
+of those incidents are always written in full.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+
+import cv2
+import numpy as np
+
+# Per-student log of frames stored as references to an earlier saved frame
+DUPLICATE_LOG = 'duplicates.jsonl'
+
+# Reasons whose frames may be stored as references (the empty-chair case)
+DEDUP_REASONS = ('face_not_detected',)
+
+HASH_SIZE = 16  # HASH_SIZE x HASH_SIZE bits
+
+_log_lock = threading.Lock()
+
+
+def perceptual_hash(frame):
+    """256-bit difference hash (dHash) of a BGR or grayscale image"""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class EvidenceIndex:
+    """
+    Small in-memory index of each student's recently saved frames
+
+    A new frame is a duplicate of a saved frame with the same reason that was
+    written less than `window_seconds` ago and whose hash differs in at most
+    `max_distance` bits. Only the newest `recent_per_student` saved frames are
+    compared, and the index is per process (after a restart the next frame is
+    simply saved in full).
+    """
+
+    def __init__(self, max_distance=8, window_seconds=300, recent_per_student=8, max_students=10000):
+        self.max_distance = max_distance
+        self.window_seconds = window_seconds
+        self.recent_per_student = recent_per_student
+        self.max_students = max_students
+
+        self._lock = threading.Lock()
+        self._students = OrderedDict()  # {student_key: deque of (saved_at, reason, hash, path)}
+        self.references = 0
+
+    def find_duplicate(self, student_key, reason, frame_hash, now):
+        """Return (path, distance) of a near-identical recent frame, or None"""
+        with self._lock:
+            recent = self._students.get(student_key)
+            if not recent:
+                return None
+            best = None
+            for saved_at, saved_reason, saved_hash, path in recent:
+                if saved_reason != reason or now - saved_at > self.window_seconds:
+                    continue
+                distance = hamming_distance(frame_hash, saved_hash)
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (path, distance)
+            return best
+
+    def remember(self, student_key, reason, frame_hash, path, now):
+        """Register a frame that was written in full"""
+        with self._lock:
+            recent = self._students.get(student_key)
+            if recent is None:
+                recent = self._students[student_key] = deque(maxlen=self.recent_per_student)
+                if len(self._students) > self.max_students:
+                    self._students.popitem(last=False)
+            else:
+                self._students.move_to_end(student_key)
+            recent.append((now, reason, frame_hash, path))
+
+    def write_reference(self, student_folder, entry):
+        """Record a duplicate frame as a reference line instead of an image"""
+        append_reference(student_folder, entry)
+        with self._lock:
+            self.references += 1
+
+    def snapshot(self):
+        """Index size and references written, for health checks"""
+        with self._lock:
+            return {'students': len(self._students), 'references_written': self.references}
+
+
+def append_reference(student_folder, entry):
+    """Append one reference entry to the student's duplicates log"""
+    line = json.dumps(entry) + '\n'
+    with _log_lock:
+        with open(os.path.join(student_folder, DUPLICATE_LOG), 'a') as f:
+            f.write(line)
+
+
+def read_references(student_folder):
+    """Reference entries of a student, oldest first"""
+    path = os.path.join(student_folder, DUPLICATE_LOG)
+    entries = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # torn line from an interrupted write
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def prune_references(student_folder, deleted_names):
+    """Drop references to frames that were deleted; removes the log when nothing is left"""
+    path = os.path.join(student_folder, DUPLICATE_LOG)
+    with _log_lock:
+        entries = read_references(student_folder)
+        kept = [entry for entry in entries if entry.get('duplicate_of') not in deleted_names]
+        if len(kept) == len(entries):
+            return 0
+        if not kept:
+            os.remove(path)
+        else:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.writelines(json.dumps(entry) + '\n' for entry in kept)
+            os.replace(tmp_path, path)
+        return len(entries) - len(kept)
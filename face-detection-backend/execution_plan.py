@@ -0,0 +1,91 @@
+"""
+CPU-topology-aware execution planning
+Decides how many frames to analyze concurrently and how many threads OpenCV may use
+for each, based on the cores this process may actually run on (CPU affinity and
+cgroup CPU quota, e.g. inside Docker/Kubernetes). Without a plan every request
+thread lets OpenCV spawn one worker per core and they all fight over the same CPUs.
+"""
+import math
+import os
+
+import cv2
+
+CGROUP_V2_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_QUOTA = '/sys/fs/cgroup/cpu/cpu.cfs_quota_us'
+CGROUP_V1_PERIOD = '/sys/fs/cgroup/cpu/cpu.cfs_period_us'
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota():
+    """CPU limit imposed by the cgroup in cores (e.g. 2.5), or None if unlimited"""
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+
+    quota, period = _read(CGROUP_V1_QUOTA), _read(CGROUP_V1_PERIOD)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def allowed_cores():
+    """Cores this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def build_plan(detection_workers=0, opencv_threads=0, pin_cores=False, processes=1):
+    """
+    Work out the execution plan of one of `processes` API processes (0 = choose automatically)
+
+    By default every usable core runs one detection with a single OpenCV thread,
+    which gives the best throughput for many small frames. The usable cores are
+    shared by all processes on the host (e.g. gunicorn workers), so each process
+    plans for its share. Explicit values (e.g. from scripts/calibrate_execution.py)
+    override either side of the split and are per process.
+    """
+    cores = allowed_cores()
+    quota = cgroup_cpu_quota()
+    usable = len(cores)
+    if quota is not None:
+        usable = max(1, min(usable, math.ceil(quota)))
+    processes = max(1, processes)
+    share = max(1, usable // processes)
+
+    if detection_workers <= 0 and opencv_threads <= 0:
+        detection_workers, opencv_threads = share, 1
+    elif detection_workers <= 0:
+        detection_workers = max(1, share // opencv_threads)
+    elif opencv_threads <= 0:
+        opencv_threads = max(1, share // detection_workers)
+
+    return {
+        'cpu_count': os.cpu_count(),
+        'allowed_cores': len(cores),
+        'cgroup_cpu_quota': quota,
+        'usable_cpus': usable,
+        'processes': processes,
+        'cpus_per_process': share,
+        'detection_workers': detection_workers,
+        'opencv_threads': opencv_threads,
+        'oversubscribed': processes * detection_workers * opencv_threads > usable,
+        'pinned_cores': cores[:usable] if pin_cores else None
+    }
+
+
+def apply_plan(plan):
+    """Configure OpenCV threading and (optionally) CPU affinity for this process"""
+    cv2.setNumThreads(plan['opencv_threads'])
+    if plan['pinned_cores'] and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, plan['pinned_cores'])
@@ -0,0 +1,158 @@
+"""
+Compact binary frame format for /analyze-frame and /batch-analyze
+Lets clients send pre-downscaled raw pixels instead of base64 JPEG in JSON.
+
+Each frame is a 14-byte little-endian header followed by the payload:
+
+    magic     4 bytes   b'GLF1'
+    width     uint16    pixels
+    height    uint16    pixels
+    channels  uint8     1 for GRAY8, 3 for BGR8, 0 for JPEG
+    format    uint8     FORMAT_GRAY8 / FORMAT_BGR8 / FORMAT_JPEG
+    length    uint32    payload size in bytes
+
+Raw payloads are row-major uint8 pixels (width * height * channels bytes) and
+must be at least MIN_RAW_WIDTH x MIN_RAW_HEIGHT, below which no face can be judged.
+A batch body is simply several frames back to back.
+"""
+import struct
+
+import numpy as np
+
+FRAME_MAGIC = b'GLF1'
+FRAME_HEADER = struct.Struct('<4sHHBBI')
+FRAME_CONTENT_TYPES = ('application/x-gradelink-frame', 'application/octet-stream')
+
+FORMAT_GRAY8 = 0  # raw 8-bit grayscale, fed straight to the detector
+FORMAT_BGR8 = 1   # raw 8-bit BGR, converted to grayscale server-side
+FORMAT_JPEG = 2   # encoded JPEG, used when the server asks for evidence
+
+FORMAT_CHANNELS = {FORMAT_GRAY8: 1, FORMAT_BGR8: 3}
+
+# Smallest raw frame accepted; the detector's window alone is 24x24 pixels
+MIN_RAW_WIDTH = 64
+MIN_RAW_HEIGHT = 48
+
+
+class FrameFormatError(ValueError):
+    """Raised when a binary frame is malformed"""
+
+
+class FrameTooLargeError(FrameFormatError):
+    """Raised when a frame payload exceeds the allowed size"""
+
+
+class FrameRecord:
+    """One parsed frame; `data` is a zero-copy view into the buffer it was read from"""
+
+    __slots__ = ('format', 'width', 'height', 'channels', 'data')
+
+    def __init__(self, format, width, height, channels, data):
+        self.format = format
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.data = data
+
+
+def parse_frame_header(buffer, offset=0):
+    """Validate and unpack the header at `offset`. Returns (format, width, height, channels, length)"""
+    if len(buffer) - offset < FRAME_HEADER.size:
+        raise FrameFormatError('Truncated frame header')
+
+    magic, width, height, channels, fmt, length = FRAME_HEADER.unpack_from(buffer, offset)
+    if magic != FRAME_MAGIC:
+        raise FrameFormatError('Invalid frame magic')
+
+    if fmt in FORMAT_CHANNELS:
+        if channels != FORMAT_CHANNELS[fmt]:
+            raise FrameFormatError(f'Format {fmt} requires {FORMAT_CHANNELS[fmt]} channel(s), got {channels}')
+        if width < MIN_RAW_WIDTH or height < MIN_RAW_HEIGHT:
+            raise FrameFormatError(f'Raw frame must be at least {MIN_RAW_WIDTH}x{MIN_RAW_HEIGHT}, got {width}x{height}')
+        if length != width * height * channels:
+            raise FrameFormatError(f'Payload length {length} does not match {width}x{height}x{channels}')
+    elif fmt != FORMAT_JPEG:
+        raise FrameFormatError(f'Unknown frame format {fmt}')
+
+    return fmt, width, height, channels, length
+
+
+def _record(buffer, fmt, width, height, channels, length, start):
+    data = np.frombuffer(buffer, np.uint8, count=length, offset=start)
+    if fmt != FORMAT_JPEG:
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        data = data.reshape(shape)
+    return FrameRecord(fmt, width, height, channels, data)
+
+
+def parse_frame(buffer, offset=0):
+    """Parse one frame at `offset`. Returns (FrameRecord, offset of the next frame)"""
+    fmt, width, height, channels, length = parse_frame_header(buffer, offset)
+
+    start = offset + FRAME_HEADER.size
+    end = start + length
+    if end > len(buffer):
+        raise FrameFormatError('Truncated frame payload')
+
+    return _record(buffer, fmt, width, height, channels, length, start), end
+
+
+def iter_frames(buffer):
+    """Yield every FrameRecord in a batch body"""
+    offset = 0
+    while offset < len(buffer):
+        record, offset = parse_frame(buffer, offset)
+        yield record
+
+
+def _read_exact(stream, size):
+    """Read exactly `size` bytes (fewer only at end of stream)"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+
+def read_frame(stream, max_payload=None):
+    """
+    Read one frame from a file-like stream. Returns a FrameRecord, or None at end of stream
+    The record owns its own buffer. Payloads larger than `max_payload` bytes are
+    rejected before they are read.
+    """
+    header = _read_exact(stream, FRAME_HEADER.size)
+    if not header:
+        return None
+    fmt, width, height, channels, length = parse_frame_header(header)
+    if max_payload is not None and length > max_payload:
+        raise FrameTooLargeError(f'Frame payload of {length} bytes exceeds the {max_payload} byte limit')
+
+    payload = _read_exact(stream, length)
+    if len(payload) < length:
+        raise FrameFormatError('Truncated frame payload')
+    return _record(payload, fmt, width, height, channels, length, 0)
+
+
+def read_frames(stream, max_payload=None):
+    """Yield every FrameRecord from a file-like body, reading one frame at a time"""
+    while True:
+        record = read_frame(stream, max_payload)
+        if record is None:
+            return
+        yield record
+
+
+def pack_frame(image=None, jpeg_bytes=None):
+    """Build a binary frame from a uint8 image (gray or BGR) or from JPEG bytes"""
+    if jpeg_bytes is not None:
+        return FRAME_HEADER.pack(FRAME_MAGIC, 0, 0, 0, FORMAT_JPEG, len(jpeg_bytes)) + bytes(jpeg_bytes)
+
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape[:2]
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    fmt = FORMAT_GRAY8 if channels == 1 else FORMAT_BGR8
+    return FRAME_HEADER.pack(FRAME_MAGIC, width, height, channels, fmt, image.nbytes) + image.tobytes()
@@ -0,0 +1,157 @@
+"""
+In-memory live status of every monitored student
+Updated from each analyzed frame so a teacher dashboard can read a whole class
+in one request (or follow changes as server-sent events) without touching the
+evidence folders on disk.
+"""
+import threading
+import time
+from collections import deque
+
+
+class _StudentStatus:
+    __slots__ = ('reason', 'cheating', 'coverage', 'last_seen', 'last_change', 'incidents', 'frames')
+
+    def __init__(self, now):
+        self.reason = None
+        self.cheating = False
+        self.coverage = 0.0
+        self.last_seen = now
+        self.last_change = now
+        self.incidents = 0
+        self.frames = 0
+
+
+class LiveStatusIndex:
+    """
+    Latest verdict per (session, student)
+
+    - An incident is counted each time a student goes from OK (or unseen) to suspicious
+    - A change (new student or different reason) bumps the version and wakes event subscribers
+    - Students not seen for `stale_seconds` are reported offline
+    - Sessions idle for `session_ttl` seconds are dropped
+    """
+
+    def __init__(self, stale_seconds=15, session_ttl=21600, history=1000):
+        self.stale_seconds = stale_seconds
+        self.session_ttl = session_ttl
+
+        self._cond = threading.Condition()
+        self._sessions = {}  # {session_id: {student_id: _StudentStatus}}
+        self._session_seen = {}
+        self._changes = deque(maxlen=history)  # (version, session_id, student_id)
+        self.version = 0
+        self._next_prune = 0
+
+    def update(self, session_id, student_id, result, now=None):
+        """Record the result of one analyzed frame"""
+        now = now or time.time()
+        with self._cond:
+            students = self._sessions.setdefault(session_id, {})
+            status = students.get(student_id)
+            is_new = status is None
+            if is_new:
+                status = students[student_id] = _StudentStatus(now)
+
+            status.last_seen = now
+            self._session_seen[session_id] = now
+            if result.get('frame_skipped'):
+                return
+
+            status.frames += 1
+            reason = result.get('reason')
+            cheating = bool(result.get('cheating_detected'))
+            status.coverage = float(result.get('face_coverage', 0) or 0)
+            if cheating and not status.cheating:
+                status.incidents += 1
+            status.cheating = cheating
+
+            if is_new or reason != status.reason:
+                status.reason = reason
+                status.last_change = now
+                self.version += 1
+                self._changes.append((self.version, session_id, student_id))
+                self._cond.notify_all()
+
+            if now >= self._next_prune:
+                self._prune(now)
+
+    def _prune(self, now):
+        for session_id in [s for s, seen in self._session_seen.items() if now - seen > self.session_ttl]:
+            del self._sessions[session_id]
+            del self._session_seen[session_id]
+        self._next_prune = now + 60
+
+    def _describe(self, student_id, status, now):
+        return {
+            'student_id': student_id,
+            'reason': status.reason,
+            'cheating_detected': status.cheating,
+            'face_coverage': round(status.coverage, 4),
+            'last_seen': status.last_seen,
+            'last_change': status.last_change,
+            'online': now - status.last_seen <= self.stale_seconds,
+            'incident_count': status.incidents,
+            'frames_analyzed': status.frames
+        }
+
+    def session_status(self, session_id, now=None):
+        """All students of a session, or None if the session is unknown"""
+        now = now or time.time()
+        with self._cond:
+            students = self._sessions.get(session_id)
+            if students is None:
+                return None
+            described = [self._describe(student_id, status, now) for student_id, status in students.items()]
+            version = self.version
+
+        described.sort(key=lambda student: student['student_id'])
+        return {
+            'session_id': session_id,
+            'version': version,
+            'generated_at': now,
+            'student_count': len(described),
+            'online_count': sum(1 for student in described if student['online']),
+            'flagged_count': sum(1 for student in described if student['cheating_detected']),
+            'students': described
+        }
+
+    def wait_for_changes(self, session_id, since, timeout):
+        """
+        Block until students of the session change after version `since` (or timeout)
+        Returns (latest version seen, [student status dicts], full); the list is empty
+        on timeout. `full` is True when the kept history cannot tell what changed since
+        `since` (it is older than the oldest kept change, or newer than the current
+        version, e.g. from before a restart); the list then holds the whole session.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                students = self._sessions.get(session_id, {})
+                if since > self.version or (self._changes and self._changes[0][0] > since + 1):
+                    now = time.time()
+                    return self.version, [self._describe(student_id, students[student_id], now)
+                                          for student_id in sorted(students)], True
+
+                if self.version > since:
+                    changed = {student_id for version, changed_session, student_id in self._changes
+                               if version > since and changed_session == session_id}
+                    since = self.version
+                    if changed:
+                        now = time.time()
+                        return since, [self._describe(student_id, students[student_id], now)
+                                       for student_id in sorted(changed) if student_id in students], False
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return since, [], False
+                self._cond.wait(remaining)
+
+    def snapshot(self):
+        """Index size for health checks"""
+        with self._cond:
+            return {
+                'sessions': len(self._sessions),
+                'students': sum(len(students) for students in self._sessions.values()),
+                'version': self.version
+            }
@@ -0,0 +1,202 @@
+"""
+Local socket transport for the desktop client
+In single-machine proctoring mode the desktop app and this API share a host, so
+frames can skip HTTP, base64 and JSON request parsing entirely. A client keeps one
+connection open and sends binary frames (see frame_format) back to back:
+
+    Request:   student_id length  uint16
+               flags              uint8     bit 0 = force_process, bit 1 = session id follows
+               student_id         utf-8
+               session_id length  uint16    only with flag bit 1
+               session_id         utf-8     only with flag bit 1
+               frame              GLF1 header + payload
+
+    Response:  length             uint32
+               result             utf-8 JSON, same body as /analyze-frame
+
+All integers are little-endian. Responses come back in request order. A malformed
+request gets an error response and the connection is closed.
+
+The server listens on a Unix domain socket that only the user running the API can
+open. Where Python has no Unix sockets (Windows builds, see UNIX_SOCKETS_AVAILABLE)
+the same protocol can be served on a loopback TCP port instead; any local user can
+connect to that, just as to the HTTP port.
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+
+from frame_format import FrameFormatError, read_frame
+
+REQUEST_HEADER = struct.Struct('<HB')
+SESSION_HEADER = struct.Struct('<H')
+RESPONSE_HEADER = struct.Struct('<I')
+
+FLAG_FORCE_PROCESS = 0x01
+FLAG_SESSION_ID = 0x02
+
+LOOPBACK_HOST = '127.0.0.1'
+
+UNIX_SOCKETS_AVAILABLE = hasattr(socket, 'AF_UNIX') and hasattr(socketserver, 'ThreadingUnixStreamServer')
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise EOFError
+    return data
+
+
+class _FrameRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                header = self.rfile.read(REQUEST_HEADER.size)
+                if not header:
+                    return  # client closed the connection
+                if len(header) < REQUEST_HEADER.size:
+                    raise EOFError
+                id_length, flags = REQUEST_HEADER.unpack(header)
+                student_id = _read_exact(self.rfile, id_length).decode('utf-8') or 'unknown'
+                session_id = None
+                if flags & FLAG_SESSION_ID:
+                    (session_length,) = SESSION_HEADER.unpack(_read_exact(self.rfile, SESSION_HEADER.size))
+                    session_id = _read_exact(self.rfile, session_length).decode('utf-8') or None
+                record = read_frame(self.rfile, server.max_payload)
+                if record is None:
+                    raise EOFError
+            except EOFError:
+                return
+            except (FrameFormatError, UnicodeDecodeError) as e:
+                self._respond({'error': f'Invalid frame request: {e}'})
+                return
+
+            try:
+                result = server.handle_frame(student_id, record, bool(flags & FLAG_FORCE_PROCESS), session_id)
+            except Exception as e:
+                if server.logger:
+                    server.logger.error(f"❌ Local transport frame from {student_id} failed: {e}", exc_info=True)
+                result = {'error': str(e)}
+            del record
+            self._respond(result)
+
+    def _respond(self, result):
+        body = json.dumps(result).encode('utf-8')
+        self.wfile.write(RESPONSE_HEADER.pack(len(body)) + body)
+        self.wfile.flush()
+
+
+if UNIX_SOCKETS_AVAILABLE:
+    class _UnixFrameServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class _TCPFrameServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalFrameServer:
+    """
+    Serves frames over a Unix domain socket at `path`, or on 127.0.0.1:`port`
+    `handle_frame(student_id, record, force_process, session_id)` analyzes one
+    FrameRecord and returns the response dict (session_id is None unless the client
+    sent one); it is supplied by the API so frames go through the same admission
+    control, detection and evidence saving as /analyze-frame.
+    """
+
+    def __init__(self, handle_frame, path=None, port=None, max_payload=None, logger=None):
+        if bool(path) == bool(port):
+            raise ValueError('LocalFrameServer needs either a socket path or a loopback port')
+        self.path = path
+        self.port = port
+        self.handle_frame = handle_frame
+        self.max_payload = max_payload
+        self.logger = logger
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.path or f'{LOOPBACK_HOST}:{self.port}'
+
+    def _bind_unix(self):
+        if not UNIX_SOCKETS_AVAILABLE:
+            raise OSError('Unix domain sockets are not supported on this platform')
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        try:
+            if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+                raise OSError(f'{self.path} exists and is not a socket')
+            os.remove(self.path)  # stale socket from a previous run
+        except FileNotFoundError:
+            pass
+
+        # Create the socket file owner-only from the start (runs before request threads)
+        umask = os.umask(0o177)
+        try:
+            return _UnixFrameServer(self.path, _FrameRequestHandler)
+        finally:
+            os.umask(umask)
+
+    def start(self):
+        if self.path:
+            self._server = self._bind_unix()
+        else:
+            self._server = _TCPFrameServer((LOOPBACK_HOST, self.port), _FrameRequestHandler)
+        self._server.handle_frame = self.handle_frame
+        self._server.max_payload = self.max_payload
+        self._server.logger = self.logger
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='local-transport', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if self.path:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+
+class LocalFrameClient:
+    """
+    Minimal client for the local transport (reference for desktop integrations and scripts)
+    Connects to the Unix socket at `path`, or to 127.0.0.1:`port`.
+    """
+
+    def __init__(self, path=None, port=None):
+        if path:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(path)
+        else:
+            self._sock = socket.create_connection((LOOPBACK_HOST, port))
+        self._rfile = self._sock.makefile('rb')
+
+    def analyze(self, student_id, frame, force_process=False, session_id=None):
+        """Send one packed frame (frame_format.pack_frame) and return the result dict"""
+        student = str(student_id).encode('utf-8')
+        flags = FLAG_FORCE_PROCESS if force_process else 0
+        session = b''
+        if session_id:
+            flags |= FLAG_SESSION_ID
+            session_bytes = str(session_id).encode('utf-8')
+            session = SESSION_HEADER.pack(len(session_bytes)) + session_bytes
+        self._sock.sendall(REQUEST_HEADER.pack(len(student), flags) + student + session + frame)
+        (length,) = RESPONSE_HEADER.unpack(_read_exact(self._rfile, RESPONSE_HEADER.size))
+        return json.loads(_read_exact(self._rfile, length))
+
+    def close(self):
+        self._rfile.close()
+        self._sock.close()
@@ -0,0 +1,114 @@
+"""
+On-demand request profiling
+Profiles selected requests with cProfile and keeps the newest dumps in a bounded
+directory. When profiling is disabled the decorator returns the view unchanged,
+so there is no per-request cost at all.
+"""
+import cProfile
+import functools
+import itertools
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+PROFILE_EXTENSION = '.prof'
+PROFILE_NAME = re.compile(r'^[\w.-]+\.prof$')
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and manages the dump directory
+
+    A request is profiled when the client asks for it (per-request flag) or when it
+    is the Nth request since the last sample (`sample_rate`, 0 disables sampling).
+    """
+
+    def __init__(self, enabled, sample_rate, directory, max_files):
+        self.enabled = enabled
+        self.sample_rate = max(0, int(sample_rate))
+        self.directory = directory
+        self.max_files = max(1, int(max_files))
+        self._counter = itertools.count(1)
+        self._prune_lock = threading.Lock()
+
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def should_profile(self, requested):
+        if requested:
+            return True
+        return self.sample_rate > 0 and next(self._counter) % self.sample_rate == 0
+
+    def wrap(self, view, is_requested, logger=None):
+        """
+        Decorate a Flask view so selected calls run under cProfile
+        `is_requested` is called per request and returns True if the client asked
+        for a profile.
+        """
+        if not self.enabled:
+            return view
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.should_profile(is_requested()):
+                return view(*args, **kwargs)
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active in this interpreter (e.g. a concurrent request)
+                return view(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                profile.disable()
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                try:
+                    path = self._dump(profile, view.__name__, elapsed_ms)
+                    if logger:
+                        logger.info(f"🔬 Profile written: {path} ({elapsed_ms:.1f}ms)")
+                except OSError as e:
+                    if logger:
+                        logger.error(f"❌ Failed to write profile: {e}")
+
+        return wrapper
+
+    def _dump(self, profile, label, elapsed_ms):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.directory, f"{timestamp}_{label}_{elapsed_ms:.0f}ms{PROFILE_EXTENSION}")
+        profile.dump_stats(path)
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Delete the oldest dumps beyond max_files"""
+        with self._prune_lock:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith(PROFILE_EXTENSION))
+            for name in names[:-self.max_files]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def list_profiles(self):
+        """Profile dumps, newest first"""
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(PROFILE_EXTENSION):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            profiles.append({
+                'name': name,
+                'size_bytes': stat.st_size,
+                'created': datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+        return profiles
+
+    def is_valid_name(self, name):
+        return bool(PROFILE_NAME.match(name))
@@ -0,0 +1,258 @@
+"""
+Evidence retention and background compaction
+Keeps SUSPICIOUS_FRAMES_DIR within age, size, per-student and free-disk limits.
+Runs in a low-priority daemon thread and deletes in small paced batches so it
+never competes with live requests for CPU or disk.
+"""
+import os
+import shutil
+import sys
+import threading
+import time
+
+from evidence_dedup import prune_references
+
+EVIDENCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class RetentionManager:
+    """
+    Background retention for saved evidence
+
+    Policies (0 disables a policy):
+    - max_age_seconds: delete evidence older than this
+    - max_files_per_student: keep only the newest N frames per student
+    - max_total_bytes: keep total evidence size under this, deleting oldest first
+    - reclaim_free_bytes: delete oldest evidence while the disk has less free space,
+      but only evidence older than `protect_seconds`, and only if deleting it can
+      actually restore the free space (when something else fills the disk the
+      evidence is kept and a warning is logged)
+
+    `min_free_bytes` never deletes anything: it is the floor below which
+    has_free_space() refuses new writes.
+    """
+
+    def __init__(self, root, max_age_seconds=0, max_total_bytes=0, max_files_per_student=0,
+                 min_free_bytes=0, reclaim_free_bytes=0, protect_seconds=86400,
+                 interval=600, batch_size=50, batch_pause=0.05, logger=None):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self.max_total_bytes = max_total_bytes
+        self.max_files_per_student = max_files_per_student
+        self.min_free_bytes = min_free_bytes
+        self.reclaim_free_bytes = reclaim_free_bytes
+        self.protect_seconds = protect_seconds
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.batch_pause = batch_pause
+        self.logger = logger
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()
+        self._thread = None
+
+        self.runs = 0
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+        self.last_run = None
+        self.last_run_seconds = 0.0
+        self.evidence_files = 0
+        self.evidence_bytes = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='evidence-retention', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self):
+        """Ask the background thread to run now (e.g. when the disk is filling up)"""
+        self._wake.set()
+
+    def has_free_space(self):
+        """True if the evidence disk has at least min_free_bytes available"""
+        if not self.min_free_bytes:
+            return True
+        try:
+            return shutil.disk_usage(self.root).free >= self.min_free_bytes
+        except OSError:
+            return True
+
+    def _loop(self):
+        self._lower_priority()
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"❌ Evidence retention run failed: {e}", exc_info=True)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _lower_priority(self):
+        # On Linux nice applies per thread, and the I/O scheduler derives the
+        # thread's best-effort I/O priority from its nice level
+        if sys.platform.startswith('linux'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            except (AttributeError, OSError):
+                pass
+
+    def _scan(self):
+        """Return {student: [(mtime, size, path), ...]} sorted oldest first"""
+        students = {}
+        if not os.path.isdir(self.root):
+            return students
+        for student_entry in os.scandir(self.root):
+            if not student_entry.is_dir():
+                continue
+            frames = []
+            for entry in os.scandir(student_entry.path):
+                if entry.is_file() and entry.name.lower().endswith(EVIDENCE_EXTENSIONS):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    frames.append((stat.st_mtime, stat.st_size, entry.path))
+            frames.sort()
+            students[student_entry.name] = frames
+        return students
+
+    def _select_victims(self, students, now):
+        """Pick files to delete, oldest first, according to the policies"""
+        victims = {}
+
+        for frames in students.values():
+            for mtime, size, path in frames:
+                if self.max_age_seconds and now - mtime > self.max_age_seconds:
+                    victims[path] = size
+            if self.max_files_per_student and len(frames) > self.max_files_per_student:
+                for mtime, size, path in frames[:-self.max_files_per_student]:
+                    victims[path] = size
+
+        remaining = sorted(
+            (mtime, size, path)
+            for frames in students.values()
+            for mtime, size, path in frames
+            if path not in victims
+        )
+        total = sum(size for _, size, _ in remaining)
+
+        excess = total - self.max_total_bytes if self.max_total_bytes else 0
+        for mtime, size, path in remaining:
+            if excess <= 0:
+                break
+            victims[path] = size
+            excess -= size
+
+        if self.reclaim_free_bytes:
+            self._select_for_free_space(remaining, victims, now)
+
+        return victims
+
+    def _select_for_free_space(self, remaining, victims, now):
+        """Add old evidence to `victims` if deleting it restores reclaim_free_bytes"""
+        try:
+            free = shutil.disk_usage(self.root).free
+        except OSError:
+            return
+        gap = self.reclaim_free_bytes - free - sum(victims.values())
+        if gap <= 0:
+            return
+
+        deletable = [
+            (mtime, size, path) for mtime, size, path in remaining
+            if path not in victims and now - mtime > self.protect_seconds
+        ]
+        if sum(size for _, size, _ in deletable) < gap:
+            # The disk is filled by something else - deleting evidence would not help
+            if self.logger:
+                self.logger.warning(
+                    f"⚠️ Only {free / (1024 * 1024):.0f}MB free in {self.root}, but old evidence "
+                    f"cannot free enough space; keeping it"
+                )
+            return
+
+        for mtime, size, path in deletable:
+            if gap <= 0:
+                break
+            victims[path] = size
+            gap -= size
+
+    def run_once(self):
+        """Apply every policy once. Returns (files deleted, bytes reclaimed)"""
+        with self._run_lock:
+            start = time.time()
+            students = self._scan()
+            victims = self._select_victims(students, start)
+
+            deleted = 0
+            reclaimed = 0
+            removed = set()
+            for path, size in victims.items():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    removed.add(path)
+                    continue  # already removed (e.g. by another worker)
+                except OSError as e:
+                    if self.logger:
+                        self.logger.error(f"❌ Could not delete {path}: {e}")
+                    continue
+                removed.add(path)
+                deleted += 1
+                reclaimed += size
+                if deleted % self.batch_size == 0:
+                    time.sleep(self.batch_pause)
+
+            # Near-duplicate references must not point at deleted frames
+            for student, frames in students.items():
+                names = {os.path.basename(path) for _, _, path in frames if path in removed}
+                if names:
+                    try:
+                        prune_references(os.path.join(self.root, student), names)
+                    except OSError as e:
+                        if self.logger:
+                            self.logger.error(f"❌ Could not prune duplicate references of {student}: {e}")
+
+            # Remove student folders emptied by this run (rmdir fails if a new frame arrived)
+            for student, frames in students.items():
+                if frames and all(path in victims for _, _, path in frames):
+                    try:
+                        os.rmdir(os.path.join(self.root, student))
+                    except OSError:
+                        pass
+
+            all_frames = [frame for frames in students.values() for frame in frames]
+            self.evidence_files = len(all_frames) - deleted
+            self.evidence_bytes = sum(size for _, size, _ in all_frames) - reclaimed
+            self.files_deleted += deleted
+            self.bytes_reclaimed += reclaimed
+            self.runs += 1
+            self.last_run = start
+            self.last_run_seconds = time.time() - start
+
+            if deleted and self.logger:
+                self.logger.warning(f"🧹 Evidence retention deleted {deleted} frames, reclaimed {reclaimed / (1024 * 1024):.1f}MB")
+            return deleted, reclaimed
+
+    def snapshot(self):
+        """Retention metrics for health checks"""
+        try:
+            free_bytes = shutil.disk_usage(self.root).free
+        except OSError:
+            free_bytes = None
+        return {
+            'runs': self.runs,
+            'files_deleted': self.files_deleted,
+            'bytes_reclaimed': self.bytes_reclaimed,
+            'last_run': self.last_run,
+            'last_run_seconds': round(self.last_run_seconds, 3),
+            'evidence_files': self.evidence_files,
+            'evidence_bytes': self.evidence_bytes,
+            'disk_free_bytes': free_bytes
+        }
@@ -0,0 +1,140 @@
+"""
+Execution Plan Calibration
+Benchmarks every split of the usable CPUs into parallel detections x OpenCV
+threads per detection on real frames, and prints the DETECTION_WORKERS /
+OPENCV_THREADS values that give the best throughput on this host.
+Frames go through the same detector the API uses (scale calibration and tiered
+detection as configured, one calibration per student folder), and only the CPU
+share of one of SERVER_PROCESSES API processes is split.
+
+Usage:
+    python scripts/calibrate_execution.py suspicious_frames --duration 5
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from calibration import ScaleCalibrator
+from config import (
+    SCALE_CALIBRATION_ENABLED, SCALE_CALIBRATION_SAMPLES, SCALE_CALIBRATION_MARGIN,
+    SCALE_RECALIBRATION_FRAMES, SCALE_FULL_SCAN_FRAMES, TIERED_DETECTION_ENABLED, SERVER_PROCESSES
+)
+from detection import DEFAULT_PARAMS, init_detector, detect_faces
+from execution_plan import build_plan
+from reanalyze import iter_sources
+from tiered_detection import TieredDetector, student_detector
+
+
+def load_frames(sources, limit):
+    """Load up to `limit` (student folder, grayscale frame) pairs (images only) into memory"""
+    frames = []
+    for path in iter_sources(sources):
+        frame = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if frame is not None:
+            frames.append((os.path.basename(os.path.dirname(path)), frame))
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+def api_detectors():
+    """Fresh per-student detector factory configured like the API's face_detector_for"""
+    tiers = TieredDetector() if TIERED_DETECTION_ENABLED else None
+    calibrator = None
+    if SCALE_CALIBRATION_ENABLED:
+        calibrator = ScaleCalibrator(
+            samples=SCALE_CALIBRATION_SAMPLES,
+            margin=SCALE_CALIBRATION_MARGIN,
+            relearn_frames=SCALE_RECALIBRATION_FRAMES,
+            full_scan_frames=SCALE_FULL_SCAN_FRAMES
+        )
+    return lambda student: student_detector(student, tiers, calibrator) or detect_faces
+
+
+def candidate_splits(usable):
+    """(workers, threads) pairs that fill the usable CPUs, plus the unplanned default"""
+    splits = []
+    for threads in range(1, usable + 1):
+        if usable % threads == 0:
+            splits.append((usable // threads, threads))
+    unplanned = (usable, cv2.getNumberOfCPUs())  # OpenCV default: every detection uses all cores
+    if unplanned not in splits:
+        splits.append(unplanned)
+    return splits
+
+
+def benchmark(frames, workers, threads, duration):
+    """Run detections from `workers` threads for `duration` seconds"""
+    cv2.setNumThreads(threads)
+    detector_for = api_detectors()  # every split starts uncalibrated
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        local = []
+        i = offset
+        while time.perf_counter() < deadline:
+            student, frame = frames[i % len(frames)]
+            start = time.perf_counter()
+            detector_for(student)(frame, DEFAULT_PARAMS)
+            local.append(time.perf_counter() - start)
+            i += workers
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(worker, range(workers)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'fps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95))
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Choose DETECTION_WORKERS / OPENCV_THREADS for this host')
+    parser.add_argument('sources', nargs='+', help='Evidence folders or image files used as sample frames')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per configuration')
+    parser.add_argument('--frames', type=int, default=200, help='Maximum sample frames to load')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    init_detector()
+    frames = load_frames(args.sources, args.frames)
+    if not frames:
+        sys.exit('❌ No readable images found')
+
+    plan = build_plan(processes=SERVER_PROCESSES)
+    usable = plan['cpus_per_process']
+    print(f"🖥️  {plan['usable_cpus']} usable CPUs (cores allowed: {plan['allowed_cores']}, "
+          f"cgroup quota: {plan['cgroup_cpu_quota'] or 'none'}), {usable} per API process "
+          f"({plan['processes']} processes), {len(frames)} sample frames")
+    print(f"   Detector: scale calibration {'on' if SCALE_CALIBRATION_ENABLED else 'off'}, "
+          f"tiered detection {'on' if TIERED_DETECTION_ENABLED else 'off'}")
+
+    print(f"{'workers':>7} {'threads':>7} {'fps':>8} {'p50':>8} {'p95':>8}")
+    results = []
+    for workers, threads in candidate_splits(usable):
+        result = benchmark(frames, workers, threads, args.duration)
+        results.append((result['fps'], workers, threads))
+        print(f"{workers:>7} {threads:>7} {result['fps']:>8.1f} {result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms")
+
+    fps, workers, threads = max(results)
+    print(f"\n✅ Best throughput: {fps:.1f} frames/s")
+    print(f"   DETECTION_WORKERS={workers}")
+    print(f"   OPENCV_THREADS={threads}")
@@ -0,0 +1,244 @@
+"""
+Offline Re-analysis of Stored Evidence and Recorded Frames
+Re-runs detect_face_and_validate over historical frames with new detection
+parameters (see TUNING_GUIDE.md) on a multiprocessing pool, and reports which
+verdicts changed.
+
+Sources can be evidence folders (suspicious_frames/<student>/<reason>_<timestamp>.jpg,
+whose original verdict is taken from the filename) or any folder of frame dumps
+(.jpg/.jpeg/.png images, or .glf files holding binary frames from frame_format).
+
+Progress is appended to a JSONL file as results arrive; re-running with the same
+--progress file skips frames that were already analyzed. The file starts with the
+detection parameters, and a run with different parameters refuses to resume it.
+
+Usage:
+    python scripts/reanalyze.py suspicious_frames --min-neighbors 4 --progress reanalysis.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from detection import (
+    DEFAULT_PARAMS, init_detector, invalid_frame_result, detect_encoded_frame, detect_frame_record
+)
+from frame_format import FrameFormatError, read_frames
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+FRAME_DUMP_EXTENSION = '.glf'
+
+# Evidence filenames look like face_not_detected_20251119_103045_123456.jpg
+EVIDENCE_NAME = re.compile(r'^(?P<reason>.+)_\d{8}_\d{6}_\d+\.jpe?g$')
+
+_params = None  # detection parameters of the current worker process
+
+
+def iter_sources(paths):
+    """Walk the given files/folders lazily and yield frame files in a stable order"""
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS + (FRAME_DUMP_EXTENSION,)):
+                    yield os.path.join(root, name)
+
+
+def original_verdict(path):
+    """Reason recorded in an evidence filename, or None for plain frame dumps"""
+    match = EVIDENCE_NAME.match(os.path.basename(path))
+    return match.group('reason') if match else None
+
+
+def init_worker(params):
+    """Pool initializer: one detector per process, no nested OpenCV threading"""
+    global _params
+    cv2.setNumThreads(1)
+    init_detector()
+    _params = params
+
+
+def worker_params():
+    """Detection parameters installed by init_worker in this process"""
+    return _params
+
+
+def summarize_result(frame_id, original, result):
+    return {
+        'id': frame_id,
+        'original': original,
+        'reason': result['reason'],
+        'cheating_detected': result['cheating_detected'],
+        'face_coverage': result.get('face_coverage', 0)
+    }
+
+
+def reanalyze_file(path):
+    """Analyze every frame stored in one file. Runs inside a pool worker."""
+    try:
+        with open(path, 'rb') as f:
+            if not path.lower().endswith(FRAME_DUMP_EXTENSION):
+                data = f.read()
+            else:
+                # Frame dumps can be large, so they are read one frame at a time
+                results = []
+                try:
+                    for idx, record in enumerate(read_frames(f)):
+                        result = detect_frame_record(record, _params)
+                        results.append(summarize_result(f'{path}#{idx}', None, result))
+                except FrameFormatError as e:
+                    results.append(summarize_result(path, None, invalid_frame_result(f'error: {e}')))
+                return results
+    except OSError as e:
+        return [summarize_result(path, original_verdict(path), invalid_frame_result(f'error: {e}'))]
+
+    result = detect_encoded_frame(np.frombuffer(data, np.uint8), _params)
+    return [summarize_result(path, original_verdict(path), result)]
+
+
+def params_record(params):
+    """Detection parameters as stored in progress and summary files"""
+    return {k: list(v) if isinstance(v, tuple) else v for k, v in params.items()}
+
+
+def load_progress(progress_path, params):
+    """
+    Read previously written results so an interrupted run can resume
+    Raises ValueError if the file was written with other detection parameters,
+    since verdicts of two parameter sets must not end up in one summary.
+    """
+    if not progress_path or not os.path.exists(progress_path):
+        return {}
+
+    with open(progress_path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries:
+        return {}
+
+    if entries[0].get('params') != params_record(params):
+        raise ValueError(f"{progress_path} was written with other detection parameters; "
+                         f"re-run with those or use a new --progress file")
+    return {entry['id']: entry for entry in entries[1:]}
+
+
+def build_summary(entries, params, elapsed):
+    """Verdict counts and the transitions between original and new verdicts"""
+    new_verdicts = Counter(entry['reason'] for entry in entries)
+    transitions = Counter(
+        (entry['original'], entry['reason'])
+        for entry in entries
+        if entry['original'] is not None and entry['original'] != entry['reason']
+    )
+    compared = sum(1 for entry in entries if entry['original'] is not None)
+
+    return {
+        'params': params_record(params),
+        'frames_analyzed': len(entries),
+        'frames_with_original_verdict': compared,
+        'verdicts_changed': sum(transitions.values()),
+        'elapsed_seconds': round(elapsed, 1),
+        'verdicts': dict(new_verdicts.most_common()),
+        'changes': [
+            {'from': old, 'to': new, 'count': count}
+            for (old, new), count in transitions.most_common()
+        ]
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Re-run face detection over stored evidence or frame dumps')
+    parser.add_argument('sources', nargs='+', help='Evidence folders, frame dump folders or files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Files handed to a worker at a time')
+    parser.add_argument('--progress', help='JSONL file for per-frame results; reused to resume')
+    parser.add_argument('--summary', help='Write the summary JSON to this file')
+    parser.add_argument('--scale-factor', type=float, default=DEFAULT_PARAMS['scale_factor'])
+    parser.add_argument('--min-neighbors', type=int, default=DEFAULT_PARAMS['min_neighbors'])
+    parser.add_argument('--min-face-size', type=int, default=DEFAULT_PARAMS['min_face_size'][0])
+    parser.add_argument('--visibility-threshold', type=float, default=DEFAULT_PARAMS['visibility_threshold'])
+    parser.add_argument('--coverage-override', type=float, default=DEFAULT_PARAMS['coverage_override'])
+    parser.add_argument('--edge-margin', type=int, default=DEFAULT_PARAMS['edge_margin'])
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    params = dict(DEFAULT_PARAMS)
+    params.update({
+        'scale_factor': args.scale_factor,
+        'min_neighbors': args.min_neighbors,
+        'min_face_size': (args.min_face_size, args.min_face_size),
+        'visibility_threshold': args.visibility_threshold,
+        'coverage_override': args.coverage_override,
+        'edge_margin': args.edge_margin
+    })
+
+    try:
+        done = load_progress(args.progress, params)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    if done:
+        print(f"⏩ Resuming: {len(done)} frames already analyzed")
+
+    # A file counts as done once any of its frames was recorded (dumps are written whole)
+    done_files = {entry_id.split('#')[0] for entry_id in done}
+    pending = (path for path in iter_sources(args.sources) if path not in done_files)
+
+    entries = list(done.values())
+    progress_file = open(args.progress, 'a') if args.progress else None
+    if progress_file and progress_file.tell() == 0:
+        progress_file.write(json.dumps({'params': params_record(params)}) + '\n')
+    start = time.time()
+    processed = 0
+
+    try:
+        with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(params,)) as pool:
+            for results in pool.imap_unordered(reanalyze_file, pending, chunksize=args.chunk_size):
+                entries.extend(results)
+                processed += len(results)
+                if progress_file:
+                    for entry in results:
+                        progress_file.write(json.dumps(entry) + '\n')
+                if processed % 500 < len(results):
+                    print(f"   {processed} frames analyzed ({processed / (time.time() - start):.0f}/s)")
+                    if progress_file:
+                        progress_file.flush()
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted - re-run with the same --progress file to resume")
+    finally:
+        if progress_file:
+            progress_file.close()
+
+    summary = build_summary(entries, params, time.time() - start)
+
+    print(f"\n{'='*60}")
+    print(f"📊 {summary['frames_analyzed']} frames, {summary['verdicts_changed']} of "
+          f"{summary['frames_with_original_verdict']} evidence verdicts changed")
+    print(f"{'='*60}")
+    for reason, count in summary['verdicts'].items():
+        print(f"   {reason:<28} {count}")
+    if summary['changes']:
+        print("\nChanged verdicts:")
+        for change in summary['changes']:
+            print(f"   {change['from']} → {change['to']}: {change['count']}")
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n📁 Summary written to {args.summary}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Replay Captured Traffic
+Feeds a capture file recorded with CAPTURE_ENABLED=True back through the API
+in-process (Flask test client, no network) and compares latency and verdicts
+with what the server produced when the traffic was recorded. Use it to benchmark
+detection changes and catch verdict regressions against real webcam traffic.
+
+Requests are sent on their original schedule divided by --speed (0 = as fast as
+possible) from --concurrency threads, like the many students of a live exam.
+Evidence written during the replay goes to a temporary folder unless
+--evidence-dir is given.
+
+Usage:
+    python scripts/replay_capture.py captures/frames.glc --speed 4 --concurrency 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from capture import iter_capture
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Replay captured /analyze-frame traffic and compare results')
+    parser.add_argument('capture', help='Capture file written with CAPTURE_ENABLED=True')
+    parser.add_argument('--speed', type=float, default=1.0, help='Playback speed (1 = original timing, 0 = no waiting)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at most')
+    parser.add_argument('--limit', type=int, default=0, help='Replay only the first N requests')
+    parser.add_argument('--evidence-dir', help='Keep evidence written during the replay here')
+    parser.add_argument('--show-diffs', type=int, default=10, help='Print this many changed verdicts')
+    return parser.parse_args()
+
+
+def percentiles(values):
+    if not values:
+        return 'n/a'
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:.1f}ms  p95 {p95:.1f}ms  p99 {p99:.1f}ms"
+
+
+def replay(client, records, speed, concurrency):
+    """Send every record on schedule; returns [(record, status, reason, latency_ms)]"""
+    results = []
+    lock = threading.Lock()
+
+    def send(record):
+        # Query args (force_process, session_id) and the session header are sent as recorded
+        headers = {'X-Student-Id': record.student_id}
+        if record.session_id:
+            headers['X-Session-Id'] = record.session_id
+        start = time.perf_counter()
+        response = client.post('/analyze-frame', data=record.body, content_type=record.content_type,
+                               headers=headers, query_string=record.query_string)
+        latency_ms = (time.perf_counter() - start) * 1000
+        reason = (response.get_json(silent=True) or {}).get('reason', '')
+        with lock:
+            results.append((record, response.status_code, reason, latency_ms))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        first = None
+        started = time.perf_counter()
+        for record in records:
+            if first is None:
+                first = record.timestamp
+            if speed > 0:
+                delay = (record.timestamp - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, record)
+    return results
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    # Configure the app before importing it: never re-capture, keep replay evidence and
+    # state apart from a running server (no shared state backend, no retention deleting
+    # evidence, no local transport)
+    os.environ['CAPTURE_ENABLED'] = 'False'
+    os.environ['SUSPICIOUS_FRAMES_DIR'] = args.evidence_dir or tempfile.mkdtemp(prefix='replay_evidence_')
+    os.environ['STATE_BACKEND'] = 'memory'
+    os.environ['RETENTION_ENABLED'] = 'False'
+    os.environ['LOCAL_SOCKET_PATH'] = ''
+    os.environ['LOCAL_TCP_PORT'] = '0'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import api
+
+    records = []
+    for record in iter_capture(args.capture):
+        records.append(record)
+        if args.limit and len(records) >= args.limit:
+            break
+    if not records:
+        sys.exit('❌ Capture file holds no requests')
+
+    duration = records[-1].timestamp - records[0].timestamp
+    print(f"▶️  Replaying {len(records)} requests from {len({r.student_id for r in records})} students "
+          f"({duration:.0f}s recorded, speed {args.speed or 'max'}, concurrency {args.concurrency})")
+
+    start = time.perf_counter()
+    results = replay(api.app.test_client(), records, args.speed, args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for _, status, _, _ in results)
+    changes = Counter()
+    diffs = []
+    for record, status, reason, latency_ms in results:
+        if reason != record.reason:
+            changes[(record.reason, reason)] += 1
+            diffs.append((record, reason))
+
+    print(f"\n⏱️  {len(results) / elapsed:.1f} requests/s over {elapsed:.1f}s, HTTP status: {dict(statuses)}")
+    print(f"   Recorded latency: {percentiles([r.latency_ms for r, _, _, _ in results])}")
+    print(f"   Replay latency:   {percentiles([latency for _, _, _, latency in results])}")
+
+    print(f"\n📊 Verdict changes: {sum(changes.values())} of {len(results)}")
+    for (old, new), count in changes.most_common():
+        print(f"   {old or '-'} → {new or '-'}: {count}")
+    for record, reason in sorted(diffs, key=lambda d: d[0].timestamp)[:args.show_diffs]:
+        print(f"   {time.strftime('%H:%M:%S', time.localtime(record.timestamp))} {record.student_id}: "
+              f"{record.reason or '-'} → {reason or '-'}")
+    print(f"\n📁 Replay evidence: {os.environ['SUSPICIOUS_FRAMES_DIR']}")
@@ -0,0 +1,236 @@
+"""
+Detect-once, Evaluate-many Threshold Sweep
+Tuning FACE_VISIBILITY_THRESHOLD, EDGE_MARGIN_PIXELS and FACE_COVERAGE_OVERRIDE
+does not change what the face detector finds, only how its boxes are judged. This
+tool therefore runs the detector once per frame, caches the raw boxes in a .npz
+file, and then evaluates the visibility/edge rules of detection.classify_faces for
+a whole grid of thresholds at once with NumPy.
+
+Usage:
+    # 1. Detect faces once (SCALE_FACTOR / MIN_NEIGHBORS are fixed at this step)
+    python scripts/threshold_sweep.py detect suspicious_frames recordings --cache boxes.npz
+
+    # 2. Evaluate any number of threshold grids against the cache (seconds)
+    python scripts/threshold_sweep.py evaluate boxes.npz \
+        --visibility 0.03,0.05,0.08,0.12 --edge-margin 0,3,5,10 --coverage-override 0.05,none
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from detection import DEFAULT_PARAMS, decode_gray, detect_faces, record_gray
+from frame_format import FrameFormatError, read_frames
+from reanalyze import FRAME_DUMP_EXTENSION, init_worker, iter_sources, original_verdict, worker_params
+
+# face_count value for frames that could not be decoded
+UNREADABLE = -1
+
+VERDICTS = ('ok', 'face_out_of_frame', 'face_partially_visible', 'face_not_detected', 'multiple_faces_detected')
+
+def gray_frames(path):
+    """Yield (frame_id, grayscale image or None) for every frame stored in a file"""
+    with open(path, 'rb') as f:
+        if not path.lower().endswith(FRAME_DUMP_EXTENSION):
+            yield path, decode_gray(np.frombuffer(f.read(), np.uint8))
+            return
+
+        for idx, record in enumerate(read_frames(f)):
+            yield f'{path}#{idx}', record_gray(record)
+
+
+def detect_file(path):
+    """Detect faces in every frame of a file. Runs inside a pool worker."""
+    rows = []
+    try:
+        for frame_id, gray in gray_frames(path):
+            if gray is None:
+                rows.append((frame_id, original_verdict(path), 0, 0, UNREADABLE, (0, 0, 0, 0)))
+                continue
+            h, w = gray.shape[:2]
+            faces = detect_faces(gray, worker_params())
+            box = tuple(int(v) for v in faces[0]) if len(faces) == 1 else (0, 0, 0, 0)
+            rows.append((frame_id, original_verdict(frame_id), w, h, len(faces), box))
+    except (OSError, FrameFormatError):
+        rows.append((path, original_verdict(path), 0, 0, UNREADABLE, (0, 0, 0, 0)))
+    return rows
+
+
+def run_detect(args):
+    params = dict(DEFAULT_PARAMS)
+    params.update({
+        'scale_factor': args.scale_factor,
+        'min_neighbors': args.min_neighbors,
+        'min_face_size': (args.min_face_size, args.min_face_size)
+    })
+
+    ids, originals, sizes, counts, boxes = [], [], [], [], []
+    start = time.time()
+
+    with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(params,)) as pool:
+        for rows in pool.imap(detect_file, iter_sources(args.sources), chunksize=args.chunk_size):
+            for frame_id, original, w, h, count, box in rows:
+                ids.append(frame_id)
+                originals.append(original or '')
+                sizes.append((w, h))
+                counts.append(count)
+                boxes.append(box)
+            if len(ids) % 1000 < len(rows):
+                print(f"   {len(ids)} frames detected ({len(ids) / (time.time() - start):.0f}/s)")
+
+    np.savez_compressed(
+        args.cache,
+        ids=np.array(ids),
+        original=np.array(originals),
+        size=np.array(sizes, dtype=np.int32).reshape(-1, 2),
+        face_count=np.array(counts, dtype=np.int16),
+        box=np.array(boxes, dtype=np.int32).reshape(-1, 4),
+        params=np.array(json.dumps({
+            'scale_factor': params['scale_factor'],
+            'min_neighbors': params['min_neighbors'],
+            'min_face_size': list(params['min_face_size']),
+            'reference_width': params['reference_width']
+        }))
+    )
+    print(f"📁 {len(ids)} frames cached in {args.cache} ({time.time() - start:.1f}s)")
+
+
+def parse_grid(value, allow_none=False):
+    """Parse a comma separated list of numbers ('none' disables the coverage override)"""
+    values = []
+    for item in value.split(','):
+        item = item.strip().lower()
+        if allow_none and item == 'none':
+            values.append(np.inf)
+        else:
+            values.append(float(item))
+    return np.array(values, dtype=np.float64)
+
+
+def evaluate_grid(cache, visibility, margins, overrides, chunk_size=250000):
+    """
+    Count verdicts for every (visibility, edge margin, coverage override) combination
+    Returns: {verdict: array of shape (V, E, O)}
+    """
+    counts = cache['face_count']
+    single = np.flatnonzero(counts == 1)
+    shape = (len(visibility), len(margins), len(overrides))
+
+    # A face passes the coverage rule if it reaches either threshold: (V, O)
+    coverage_needed = np.minimum(visibility[:, None], overrides[None, :])
+
+    ok = np.zeros(shape, dtype=np.int64)
+    out_of_frame = np.zeros(len(margins), dtype=np.int64)
+
+    for start in range(0, len(single), chunk_size):
+        idx = single[start:start + chunk_size]
+        x, y, fw, fh = cache['box'][idx].T.astype(np.float64)
+        w, h = cache['size'][idx].T.astype(np.float64)
+
+        coverage = (fw * fh) / (w * h)
+        # Distance to the nearest frame edge; "at edge" means closer than the margin
+        edge_distance = np.minimum.reduce([x, y, w - (x + fw), h - (y + fh)])
+
+        # Margins are set for the reference width and shrink with narrower frames
+        scale = np.minimum(1.0, w / DEFAULT_PARAMS['reference_width'])
+        at_edge = edge_distance[None, :] < margins[:, None] * scale[None, :]     # (E, F)
+        covered = coverage[None, None, :] >= coverage_needed[:, :, None]         # (V, O, F)
+        visible = covered[:, None, :, :] & ~at_edge[None, :, None, :]            # (V, E, O, F)
+
+        ok += visible.sum(axis=-1)
+        out_of_frame += at_edge.sum(axis=-1)
+
+    out_of_frame = np.broadcast_to(out_of_frame[None, :, None], shape)
+    return {
+        'ok': ok,
+        'face_out_of_frame': out_of_frame,
+        'face_partially_visible': len(single) - ok - out_of_frame,
+        'face_not_detected': np.full(shape, int((counts == 0).sum())),
+        'multiple_faces_detected': np.full(shape, int((counts > 1).sum()))
+    }
+
+
+def run_evaluate(args):
+    start = time.time()
+    with np.load(args.cache) as data:
+        cache = {key: data[key] for key in ('face_count', 'box', 'size')}
+        detect_params = json.loads(str(data['params']))
+
+    visibility = parse_grid(args.visibility)
+    margins = parse_grid(args.edge_margin)
+    overrides = parse_grid(args.coverage_override, allow_none=True)
+
+    verdicts = evaluate_grid(cache, visibility, margins, overrides)
+    total = int((cache['face_count'] != UNREADABLE).sum())
+
+    rows = []
+    for vi, vis in enumerate(visibility):
+        for ei, margin in enumerate(margins):
+            for oi, override in enumerate(overrides):
+                row = {
+                    'visibility_threshold': float(vis),
+                    'edge_margin': int(margin),
+                    'coverage_override': 'none' if np.isinf(override) else float(override)
+                }
+                for verdict in VERDICTS:
+                    row[f'{verdict}_rate'] = round(int(verdicts[verdict][vi, ei, oi]) / max(total, 1), 4)
+                row['flagged_rate'] = round(1 - row['ok_rate'], 4)
+                rows.append(row)
+
+    rows.sort(key=lambda row: row['flagged_rate'])
+
+    print(f"📊 {len(rows)} configurations x {total} frames evaluated in {time.time() - start:.2f}s "
+          f"(detector: {detect_params})")
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"📁 Results written to {args.output}")
+    else:
+        print(f"{'visibility':>10} {'margin':>6} {'override':>8} {'ok':>7} {'out':>7} {'partial':>7} {'no_face':>7} {'multi':>7}")
+        for row in rows:
+            print(f"{row['visibility_threshold']:>10} {row['edge_margin']:>6} {row['coverage_override']!s:>8} "
+                  f"{row['ok_rate']:>7.2%} {row['face_out_of_frame_rate']:>7.2%} {row['face_partially_visible_rate']:>7.2%} "
+                  f"{row['face_not_detected_rate']:>7.2%} {row['multiple_faces_detected_rate']:>7.2%}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Sweep visibility/edge thresholds over cached face detections')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    detect = commands.add_parser('detect', help='Run the detector once and cache the boxes')
+    detect.add_argument('sources', nargs='+', help='Evidence folders, frame dump folders or files')
+    detect.add_argument('--cache', required=True, help='Output .npz file')
+    detect.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    detect.add_argument('--chunk-size', type=int, default=16)
+    detect.add_argument('--scale-factor', type=float, default=DEFAULT_PARAMS['scale_factor'])
+    detect.add_argument('--min-neighbors', type=int, default=DEFAULT_PARAMS['min_neighbors'])
+    detect.add_argument('--min-face-size', type=int, default=DEFAULT_PARAMS['min_face_size'][0])
+
+    evaluate = commands.add_parser('evaluate', help='Evaluate a grid of thresholds against a cache')
+    evaluate.add_argument('cache', help='.npz file written by the detect command')
+    evaluate.add_argument('--visibility', default=str(DEFAULT_PARAMS['visibility_threshold']),
+                          help='Comma separated FACE_VISIBILITY_THRESHOLD values')
+    evaluate.add_argument('--edge-margin', default=str(DEFAULT_PARAMS['edge_margin']),
+                          help='Comma separated EDGE_MARGIN_PIXELS values')
+    evaluate.add_argument('--coverage-override', default=str(DEFAULT_PARAMS['coverage_override']),
+                          help="Comma separated FACE_COVERAGE_OVERRIDE values ('none' disables it)")
+    evaluate.add_argument('--output', help='Write results as CSV instead of printing a table')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'detect':
+        run_detect(args)
+    else:
+        run_evaluate(args)
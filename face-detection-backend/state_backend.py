@@ -0,0 +1,432 @@
+"""
+Student tracking state backends
+Holds the frame counters, save cooldowns and issue start times used by the API so
+that they can live in-process, in a SQLite file shared by several worker processes,
+or in Redis shared by several nodes behind a load balancer
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Outcomes of StateBackend.check_save()
+SAVE_COOLDOWN = 'cooldown'      # saved too recently for this student
+SAVE_FIRST_SEEN = 'first_seen'  # issue just started, persistence tracking begins
+SAVE_PENDING = 'pending'        # issue has not persisted long enough yet
+SAVE_READY = 'ready'            # issue is persistent and cooldown has passed
+
+
+class StateBackend:
+    """
+    Interface for per-student tracking state
+
+    Every method is a single atomic operation so that a check-then-act sequence
+    (cooldown test, persistence start time) costs one round trip to the backend.
+    """
+
+    name = 'base'
+
+    def frame_state(self, student_key, count_frame=True):
+        """
+        Per-frame lookup in one round trip: (frame count, has active issue)
+        Increments the frame counter when `count_frame` is set (count is None otherwise).
+        """
+        raise NotImplementedError
+
+    def check_save(self, student_key, reason, now, cooldown, min_duration):
+        """
+        Apply cooldown and persistence rules for a suspicious frame
+        Records the issue start time on first sight, and reserves the save slot
+        (sets the last save time to `now`) when returning SAVE_READY so that
+        concurrent frames of the same student see the cooldown.
+        Returns: (outcome, seconds) where seconds is the time since the last save
+        for SAVE_COOLDOWN and the issue duration otherwise
+        """
+        raise NotImplementedError
+
+    def cancel_save(self, student_key, reserved_at):
+        """Release a save slot reserved by check_save() when writing evidence failed"""
+        raise NotImplementedError
+
+    def clear_issues(self, student_key, reason=None):
+        """Stop tracking one issue (or all issues) for the student"""
+        raise NotImplementedError
+
+    def reserve_evidence_request(self, student_key, now, timeout):
+        """
+        Mark that the client was asked for a full-quality evidence frame
+        Returns False while an earlier request is outstanding (younger than `timeout`),
+        so one moment is only requested once.
+        """
+        raise NotImplementedError
+
+    def release_evidence_request(self, student_key):
+        """Forget the outstanding evidence request (the evidence frame arrived)"""
+        raise NotImplementedError
+
+    def describe(self):
+        """Return backend details for health checks"""
+        return {'backend': self.name}
+
+
+class _StateShard:
+    """One stripe of the in-process state, guarded by its own lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame_counter = {}     # {student_id: counter}
+        self.last_save_time = {}    # {student_id: timestamp}
+        self.issue_start_time = {}  # {student_id: {reason: timestamp}}
+        self.evidence_requested = {}  # {student_id: timestamp}
+
+
+class InProcessStateBackend(StateBackend):
+    """
+    State kept in dictionaries of the current process (single worker only)
+    Students are spread over `stripes` shards by hash, each with its own lock, so
+    check-then-act sequences are atomic per student while unrelated students
+    proceed in parallel on other shards.
+    """
+
+    name = 'memory'
+
+    def __init__(self, stripes=64):
+        self._shards = [_StateShard() for _ in range(max(1, int(stripes)))]
+
+    def _shard(self, student_key):
+        return self._shards[hash(student_key) % len(self._shards)]
+
+    def frame_state(self, student_key, count_frame=True):
+        shard = self._shard(student_key)
+        with shard.lock:
+            count = None
+            if count_frame:
+                count = shard.frame_counter.get(student_key, 0) + 1
+                shard.frame_counter[student_key] = count
+            return count, bool(shard.issue_start_time.get(student_key))
+
+    def check_save(self, student_key, reason, now, cooldown, min_duration):
+        shard = self._shard(student_key)
+        with shard.lock:
+            last_save = shard.last_save_time.get(student_key)
+            if last_save is not None and now - last_save < cooldown:
+                return SAVE_COOLDOWN, now - last_save
+
+            issues = shard.issue_start_time.setdefault(student_key, {})
+            if reason not in issues:
+                issues[reason] = now
+                return SAVE_FIRST_SEEN, 0.0
+
+            duration = now - issues[reason]
+            if duration < min_duration:
+                return SAVE_PENDING, duration
+
+            # Reserve the save slot so concurrent frames hit the cooldown
+            shard.last_save_time[student_key] = now
+            return SAVE_READY, duration
+
+    def cancel_save(self, student_key, reserved_at):
+        shard = self._shard(student_key)
+        with shard.lock:
+            if shard.last_save_time.get(student_key) == reserved_at:
+                del shard.last_save_time[student_key]
+
+    def clear_issues(self, student_key, reason=None):
+        shard = self._shard(student_key)
+        with shard.lock:
+            if student_key in shard.issue_start_time:
+                if reason:
+                    shard.issue_start_time[student_key].pop(reason, None)
+                else:
+                    shard.issue_start_time[student_key] = {}
+
+    def reserve_evidence_request(self, student_key, now, timeout):
+        shard = self._shard(student_key)
+        with shard.lock:
+            requested_at = shard.evidence_requested.get(student_key)
+            if requested_at is not None and now - requested_at < timeout:
+                return False
+            shard.evidence_requested[student_key] = now
+            return True
+
+    def release_evidence_request(self, student_key):
+        shard = self._shard(student_key)
+        with shard.lock:
+            shard.evidence_requested.pop(student_key, None)
+
+    def describe(self):
+        return {'backend': self.name, 'stripes': len(self._shards)}
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    State kept in a SQLite database file, shared by worker processes on one host
+    Each operation runs in its own IMMEDIATE transaction, which takes the write lock
+    up front so concurrent workers cannot interleave a check and its update.
+    Connections come from a pool of at most `pool_size`, so request threads reuse
+    them instead of each opening (and leaking) a connection of its own.
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS frame_counter (
+            student_key TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS last_save_time (
+            student_key TEXT PRIMARY KEY,
+            saved_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS issue_start_time (
+            student_key TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            PRIMARY KEY (student_key, reason)
+        );
+        CREATE TABLE IF NOT EXISTS evidence_request (
+            student_key TEXT PRIMARY KEY,
+            requested_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, timeout=5.0, pool_size=4):
+        self.path = path
+        self.timeout = timeout
+        self.pool_size = max(1, int(pool_size))
+        self._pool = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        # At most pool_size connections exist; further threads wait for a free one
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                       isolation_level=None, check_same_thread=False)
+                conn.execute('PRAGMA synchronous=NORMAL')
+            try:
+                yield conn
+            finally:
+                self._pool.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def frame_state(self, student_key, count_frame=True):
+        if not count_frame:
+            with self._connection() as conn:  # read only, no write lock
+                row = conn.execute(
+                    'SELECT 1 FROM issue_start_time WHERE student_key = ? LIMIT 1', (student_key,)
+                ).fetchone()
+            return None, row is not None
+
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO frame_counter (student_key, count) VALUES (?, 1) '
+                'ON CONFLICT(student_key) DO UPDATE SET count = count + 1',
+                (student_key,)
+            )
+            count, active = conn.execute(
+                'SELECT count, EXISTS(SELECT 1 FROM issue_start_time WHERE student_key = ?) '
+                'FROM frame_counter WHERE student_key = ?',
+                (student_key, student_key)
+            ).fetchone()
+        return count, bool(active)
+
+    def check_save(self, student_key, reason, now, cooldown, min_duration):
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT saved_at FROM last_save_time WHERE student_key = ?', (student_key,)
+            ).fetchone()
+            if row is not None and now - row[0] < cooldown:
+                return SAVE_COOLDOWN, now - row[0]
+
+            row = conn.execute(
+                'SELECT started_at FROM issue_start_time WHERE student_key = ? AND reason = ?',
+                (student_key, reason)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    'INSERT INTO issue_start_time (student_key, reason, started_at) VALUES (?, ?, ?)',
+                    (student_key, reason, now)
+                )
+                return SAVE_FIRST_SEEN, 0.0
+
+            duration = now - row[0]
+            if duration < min_duration:
+                return SAVE_PENDING, duration
+
+            # Reserve the save slot so concurrent frames hit the cooldown
+            conn.execute(
+                'INSERT INTO last_save_time (student_key, saved_at) VALUES (?, ?) '
+                'ON CONFLICT(student_key) DO UPDATE SET saved_at = excluded.saved_at',
+                (student_key, now)
+            )
+            return SAVE_READY, duration
+
+    def cancel_save(self, student_key, reserved_at):
+        with self._connection() as conn:
+            conn.execute(
+                'DELETE FROM last_save_time WHERE student_key = ? AND saved_at = ?',
+                (student_key, reserved_at)
+            )
+
+    def clear_issues(self, student_key, reason=None):
+        with self._connection() as conn:
+            if reason:
+                conn.execute(
+                    'DELETE FROM issue_start_time WHERE student_key = ? AND reason = ?',
+                    (student_key, reason)
+                )
+            else:
+                conn.execute('DELETE FROM issue_start_time WHERE student_key = ?', (student_key,))
+
+    def reserve_evidence_request(self, student_key, now, timeout):
+        # Upsert only if no request is outstanding; rowcount tells whether we got it
+        with self._connection() as conn:
+            cursor = conn.execute(
+                'INSERT INTO evidence_request (student_key, requested_at) VALUES (?, ?) '
+                'ON CONFLICT(student_key) DO UPDATE SET requested_at = excluded.requested_at '
+                'WHERE ? - evidence_request.requested_at >= ?',
+                (student_key, now, now, timeout)
+            )
+            return cursor.rowcount > 0
+
+    def release_evidence_request(self, student_key):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM evidence_request WHERE student_key = ?', (student_key,))
+
+    def describe(self):
+        return {'backend': self.name, 'path': self.path, 'pool_size': self.pool_size}
+
+
+class RedisStateBackend(StateBackend):
+    """
+    State kept in Redis, shared by every node behind the load balancer
+    The cooldown and persistence rules run as one Lua script so they are atomic on
+    the server and cost a single round trip. Keys expire after `ttl` seconds of
+    inactivity so finished exams do not accumulate.
+    Any client exposing the redis-py API can be passed in, e.g. fakeredis for tests.
+    """
+
+    name = 'redis'
+
+    CHECK_SAVE_SCRIPT = """
+        local now = tonumber(ARGV[2])
+        local last = redis.call('GET', KEYS[1])
+        if last and now - tonumber(last) < tonumber(ARGV[3]) then
+            return {ARGV[5], tostring(now - tonumber(last))}
+        end
+        local started = redis.call('HGET', KEYS[2], ARGV[1])
+        if not started then
+            redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+            redis.call('EXPIRE', KEYS[2], ARGV[4])
+            return {ARGV[6], '0'}
+        end
+        local duration = now - tonumber(started)
+        if duration < tonumber(ARGV[7]) then
+            return {ARGV[8], tostring(duration)}
+        end
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[4])
+        return {ARGV[9], tostring(duration)}
+    """
+
+    CANCEL_SAVE_SCRIPT = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            return redis.call('DEL', KEYS[1])
+        end
+        return 0
+    """
+
+    def __init__(self, url=None, prefix='gradelink', ttl=21600, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package (pip install redis)")
+            client = redis.Redis.from_url(url)
+
+        self.client = client
+        self.prefix = prefix
+        self.ttl = int(ttl)
+        self._check_save = client.register_script(self.CHECK_SAVE_SCRIPT)
+        self._cancel_save = client.register_script(self.CANCEL_SAVE_SCRIPT)
+
+    def _key(self, kind, student_key):
+        return f"{self.prefix}:{kind}:{student_key}"
+
+    def frame_state(self, student_key, count_frame=True):
+        pipe = self.client.pipeline()
+        if count_frame:
+            key = self._key('frame_counter', student_key)
+            pipe.incr(key)
+            pipe.expire(key, self.ttl)
+        pipe.hlen(self._key('issues', student_key))
+        replies = pipe.execute()
+        count = int(replies[0]) if count_frame else None
+        return count, replies[-1] > 0
+
+    def check_save(self, student_key, reason, now, cooldown, min_duration):
+        outcome, seconds = self._check_save(
+            keys=[self._key('last_save', student_key), self._key('issues', student_key)],
+            args=[reason, repr(now), cooldown, self.ttl,
+                  SAVE_COOLDOWN, SAVE_FIRST_SEEN, min_duration, SAVE_PENDING, SAVE_READY]
+        )
+        if isinstance(outcome, bytes):
+            outcome = outcome.decode()
+        return outcome, float(seconds)
+
+    def cancel_save(self, student_key, reserved_at):
+        self._cancel_save(keys=[self._key('last_save', student_key)], args=[repr(reserved_at)])
+
+    def clear_issues(self, student_key, reason=None):
+        key = self._key('issues', student_key)
+        if reason:
+            self.client.hdel(key, reason)
+        else:
+            self.client.delete(key)
+
+    def reserve_evidence_request(self, student_key, now, timeout):
+        # The key expiring ends the request, so no timestamp comparison is needed
+        key = self._key('evidence_request', student_key)
+        return bool(self.client.set(key, repr(now), nx=True, px=max(1, int(timeout * 1000))))
+
+    def release_evidence_request(self, student_key):
+        self.client.delete(self._key('evidence_request', student_key))
+
+    def describe(self):
+        return {'backend': self.name, 'prefix': self.prefix, 'ttl': self.ttl}
+
+
+def create_state_backend(kind, stripes=64, sqlite_path=None, sqlite_pool_size=4, redis_url=None,
+                         redis_prefix='gradelink', redis_ttl=21600):
+    """Build the state backend selected by STATE_BACKEND"""
+    if kind == 'memory':
+        return InProcessStateBackend(stripes)
+    if kind == 'sqlite':
+        return SQLiteStateBackend(sqlite_path, pool_size=sqlite_pool_size)
+    if kind == 'redis':
+        return RedisStateBackend(redis_url, prefix=redis_prefix, ttl=redis_ttl)
+    raise ValueError(f"Unknown STATE_BACKEND '{kind}' (expected memory, sqlite or redis)")
@@ -0,0 +1,55 @@
+"""
+Batch job uploads are refused while they are read once they exceed the byte budget
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, PRIORITY_BATCH
+from batch_jobs import BatchJobManager, JobLimitError
+
+FRAME = b'\0' * 1000
+
+
+def manager(max_queued_bytes):
+    return BatchJobManager(lambda job, frame: ({}, False), max_queued_bytes=max_queued_bytes)
+
+
+def test_oversized_upload_stops_being_read_at_the_budget():
+    read = []
+
+    def upload():
+        for idx in range(100):
+            read.append(idx)
+            yield FRAME
+
+    with pytest.raises(JobLimitError):
+        manager(3500).submit('STU001', upload(), None)
+    assert len(read) == 4
+
+
+def test_refused_upload_releases_its_reservation():
+    jobs = manager(3500)
+    with pytest.raises(JobLimitError):
+        jobs.submit('STU001', iter([FRAME] * 5), None)
+    assert jobs.snapshot()['queued_bytes'] == 0
+
+    job = jobs.submit('STU001', iter([FRAME] * 3), None)
+    assert job.total_frames == 3
+
+
+def test_empty_upload_is_refused():
+    with pytest.raises(ValueError):
+        manager(0).submit('STU001', iter([]), None)
+
+
+def test_retried_admission_counts_one_refusal():
+    admission = AdmissionController(max_concurrent=1, max_pending=0, wait_timeout=0)
+    assert admission.acquire()
+    assert not admission.acquire(PRIORITY_BATCH)
+    for _ in range(5):
+        assert not admission.acquire(PRIORITY_BATCH, retry=True)
+    assert admission.snapshot()['rejected'] == 1
@@ -0,0 +1,59 @@
+"""
+Scale calibration must not hide a second face outside the learned band
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calibration import ScaleCalibrator
+from detection import DEFAULT_PARAMS
+
+GRAY = np.zeros((480, 640), np.uint8)
+STUDENT = (200, 150, 150, 150)
+SECOND_PERSON = (40, 60, 60, 60)
+
+
+class StubDetector:
+    """Returns the scene's faces whose width lies within minSize/maxSize"""
+
+    def __init__(self, faces):
+        self.faces = list(faces)
+        self.full_range_calls = 0
+
+    def __call__(self, gray, params, min_size=None, max_size=None):
+        if min_size is None:
+            self.full_range_calls += 1
+        low = min_size[0] if min_size else 0
+        high = max_size[0] if max_size else 10 ** 6
+        return [face for face in self.faces if low <= face[2] <= high]
+
+
+def run(calibrator, detector, frames):
+    return [len(calibrator.detect('STU001', GRAY, DEFAULT_PARAMS, detector)) for _ in range(frames)]
+
+
+def test_second_face_outside_band_is_found_by_full_scan():
+    calibrator = ScaleCalibrator(samples=3, margin=0.4, full_scan_frames=5)
+    detector = StubDetector([STUDENT])
+    run(calibrator, detector, 3)
+    assert calibrator.snapshot()['calibrated'] == 1
+
+    detector.faces.append(SECOND_PERSON)
+    counts = run(calibrator, detector, 8)
+    assert 2 in counts[:5]
+
+    # Once seen, every following frame is searched in full until the anomaly is gone
+    assert counts[counts.index(2):] == [2] * (8 - counts.index(2))
+
+
+def test_calibrated_frames_mostly_use_the_band():
+    calibrator = ScaleCalibrator(samples=3, margin=0.4, full_scan_frames=10)
+    detector = StubDetector([STUDENT])
+    run(calibrator, detector, 3)
+    detector.full_range_calls = 0
+
+    assert run(calibrator, detector, 20) == [1] * 20
+    assert detector.full_range_calls == 2
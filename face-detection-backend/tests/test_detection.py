@@ -0,0 +1,60 @@
+"""
+Face size and edge margin follow the frame resolution; tiny raw frames are rejected;
+raw frame buffers are reused across request threads
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detection import DEFAULT_PARAMS, GrayBufferPool, classify_faces, min_face_size
+from frame_format import FrameFormatError, pack_frame, parse_frame
+
+PARAMS = dict(DEFAULT_PARAMS, reference_width=640, min_face_size=(40, 40), edge_margin=8)
+
+
+def test_min_face_size_scales_down_with_narrow_frames():
+    assert min_face_size(640, PARAMS) == (40, 40)
+    assert min_face_size(1920, PARAMS) == (40, 40)
+    assert min_face_size(160, PARAMS) == (10, 10)
+
+
+def test_edge_margin_scales_with_frame_width():
+    # 3 pixels from the left edge: inside the full 8 pixel margin, outside the scaled 2 pixel one
+    face_at_160 = [(3, 30, 60, 60)]
+    assert classify_faces(face_at_160, 160, 120, PARAMS)['reason'] == 'ok'
+
+    face_at_640 = [(3, 120, 240, 240)]
+    assert classify_faces(face_at_640, 640, 480, PARAMS)['reason'] == 'face_out_of_frame'
+
+
+def test_tiny_raw_frames_are_rejected():
+    with pytest.raises(FrameFormatError):
+        parse_frame(pack_frame(np.zeros((1, 1), np.uint8)))
+    record, _ = parse_frame(pack_frame(np.zeros((120, 160), np.uint8)))
+    assert (record.width, record.height) == (160, 120)
+
+
+def test_gray_buffers_are_reused_across_threads():
+    pool = GrayBufferPool(max_free=2)
+    seen = []
+
+    def borrow():
+        with pool.buffer((48, 64)) as buffer:
+            seen.append(id(buffer))
+
+    # A new thread per request, as the threaded dev server does
+    for _ in range(3):
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        thread.join()
+    assert len(set(seen)) == 1
+
+    with pool.buffer((48, 64)) as first, pool.buffer((48, 64)) as second, pool.buffer((96, 128)) as third:
+        assert first is not second
+        assert third.shape == (96, 128)
+    assert pool.snapshot()['free'] == 2
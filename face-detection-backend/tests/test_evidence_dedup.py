@@ -0,0 +1,64 @@
+"""
+Near-duplicate evidence: the same empty desk matches, a changed scene does not
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evidence_dedup import EvidenceIndex, perceptual_hash
+
+REASON = 'face_not_detected'
+
+
+def desk_scene():
+    image = np.tile(np.linspace(60, 200, 640, dtype=np.uint8), (480, 1))
+    cv2.rectangle(image, (0, 360), (640, 480), 90, -1)    # desk
+    cv2.rectangle(image, (420, 80), (560, 300), 150, -1)  # shelf
+    return image
+
+
+def with_sensor_noise(image, seed=0):
+    noise = np.random.default_rng(seed).integers(-4, 5, image.shape)
+    return np.clip(image.astype(int) + noise, 0, 255).astype(np.uint8)
+
+
+def with_person_at_side(image):
+    image = image.copy()
+    cv2.ellipse(image, (80, 200), (50, 65), 0, 0, 360, 210, -1)
+    cv2.rectangle(image, (20, 260), (140, 480), 40, -1)
+    return image
+
+
+def with_phone(image):
+    image = image.copy()
+    cv2.rectangle(image, (280, 180), (360, 330), 20, -1)
+    return image
+
+
+def index_with_saved_desk():
+    index = EvidenceIndex()
+    index.remember('STU001', REASON, perceptual_hash(desk_scene()), 'desk.jpg', 100.0)
+    return index
+
+
+def test_same_empty_desk_is_a_duplicate():
+    index = index_with_saved_desk()
+    match = index.find_duplicate('STU001', REASON, perceptual_hash(with_sensor_noise(desk_scene())), 130.0)
+    assert match is not None and match[0] == 'desk.jpg'
+
+
+def test_changed_scene_is_not_a_duplicate():
+    index = index_with_saved_desk()
+    for changed in (with_person_at_side(desk_scene()), with_phone(desk_scene())):
+        assert index.find_duplicate('STU001', REASON, perceptual_hash(changed), 130.0) is None
+
+
+def test_duplicate_window_and_reason():
+    index = index_with_saved_desk()
+    frame_hash = perceptual_hash(desk_scene())
+    assert index.find_duplicate('STU001', 'face_out_of_frame', frame_hash, 130.0) is None
+    assert index.find_duplicate('STU001', REASON, frame_hash, 100.0 + index.window_seconds + 1) is None
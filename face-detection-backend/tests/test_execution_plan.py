@@ -0,0 +1,28 @@
+"""
+The execution plan splits the usable CPUs between the API processes of a host
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import execution_plan
+from execution_plan import build_plan
+
+
+def with_cpus(monkeypatch, cores, quota=None):
+    monkeypatch.setattr(execution_plan, 'allowed_cores', lambda: list(range(cores)))
+    monkeypatch.setattr(execution_plan, 'cgroup_cpu_quota', lambda: quota)
+
+
+def test_each_process_plans_for_its_share(monkeypatch):
+    with_cpus(monkeypatch, 8)
+    plan = build_plan(processes=4)
+    assert (plan['cpus_per_process'], plan['detection_workers'], plan['opencv_threads']) == (2, 2, 1)
+    assert not plan['oversubscribed']
+
+
+def test_oversubscription_counts_every_process(monkeypatch):
+    with_cpus(monkeypatch, 8, quota=4.0)
+    assert not build_plan(detection_workers=4)['oversubscribed']
+    assert build_plan(detection_workers=4, processes=2)['oversubscribed']
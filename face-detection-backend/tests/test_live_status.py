@@ -0,0 +1,68 @@
+"""
+Live status: incidents, versions, and what a reconnecting event stream is sent
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from live_status import LiveStatusIndex
+
+OK = {'reason': 'ok', 'cheating_detected': False, 'face_coverage': 0.2}
+AWAY = {'reason': 'face_not_detected', 'cheating_detected': True, 'face_coverage': 0}
+
+
+def test_incidents_and_versions():
+    index = LiveStatusIndex()
+    index.update('exam', 'S1', OK, now=100)
+    index.update('exam', 'S1', OK, now=101)
+    index.update('exam', 'S1', AWAY, now=102)
+    index.update('exam', 'S1', OK, now=103)
+    index.update('exam', 'S1', AWAY, now=104)
+
+    status = index.session_status('exam', now=105)
+    student = status['students'][0]
+    assert status['version'] == 4  # new student + three reason changes
+    assert student['incident_count'] == 2
+    assert student['frames_analyzed'] == 5
+    assert student['online']
+    assert index.session_status('other') is None
+
+
+def test_changes_since_a_version():
+    index = LiveStatusIndex()
+    index.update('exam', 'S1', OK)
+    index.update('exam', 'S2', OK)
+    index.update('other', 'S3', AWAY)
+    index.update('exam', 'S1', AWAY)
+
+    version, changed, full = index.wait_for_changes('exam', 1, timeout=0)
+    assert (version, full) == (4, False)
+    assert [student['student_id'] for student in changed] == ['S1', 'S2']
+
+    assert index.wait_for_changes('exam', 4, timeout=0) == (4, [], False)
+
+
+def test_version_after_restart_gets_full_session():
+    index = LiveStatusIndex()
+    index.update('exam', 'S1', OK)
+    index.update('exam', 'S2', AWAY)
+
+    # A client that saw version 50 of the previous server process
+    version, students, full = index.wait_for_changes('exam', 50, timeout=0)
+    assert full and version == 2
+    assert [student['student_id'] for student in students] == ['S1', 'S2']
+
+
+def test_version_older_than_history_gets_full_session():
+    index = LiveStatusIndex(history=2)
+    for student_id in ('S1', 'S2', 'S3', 'S4'):
+        index.update('exam', student_id, OK)
+
+    version, students, full = index.wait_for_changes('exam', 1, timeout=0)
+    assert full and version == 4
+    assert len(students) == 4
+
+    _, changed, full = index.wait_for_changes('exam', 2, timeout=0)
+    assert not full
+    assert [student['student_id'] for student in changed] == ['S3', 'S4']
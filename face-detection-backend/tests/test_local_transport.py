@@ -0,0 +1,65 @@
+"""
+Local transport: owner-only socket, no clobbering of other files, session ids
+"""
+import os
+import socket
+import stat
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_format import pack_frame
+from local_transport import UNIX_SOCKETS_AVAILABLE, LocalFrameClient, LocalFrameServer
+
+FRAME = pack_frame(np.zeros((48, 64), np.uint8))
+
+
+def echo(student_id, record, force_process, session_id):
+    return {'student_id': student_id, 'session_id': session_id, 'width': record.width}
+
+
+@pytest.mark.skipif(not UNIX_SOCKETS_AVAILABLE, reason='no Unix domain sockets')
+def test_unix_socket_is_owner_only_and_carries_session(tmp_path):
+    path = str(tmp_path / 'run' / 'detection.sock')
+    server = LocalFrameServer(echo, path=path)
+    server.start()
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        client = LocalFrameClient(path)
+        assert client.analyze('STU001', FRAME, session_id='exam-1') == {
+            'student_id': 'STU001', 'session_id': 'exam-1', 'width': 64
+        }
+        assert client.analyze('STU001', FRAME)['session_id'] is None
+        client.close()
+    finally:
+        server.stop()
+
+
+@pytest.mark.skipif(not UNIX_SOCKETS_AVAILABLE, reason='no Unix domain sockets')
+def test_existing_file_is_not_replaced(tmp_path):
+    path = tmp_path / 'important.txt'
+    path.write_text('keep me')
+    with pytest.raises(OSError):
+        LocalFrameServer(echo, path=str(path)).start()
+    assert path.read_text() == 'keep me'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_loopback_tcp_fallback():
+    port = free_port()
+    server = LocalFrameServer(echo, port=port)
+    server.start()
+    try:
+        client = LocalFrameClient(port=port)
+        assert client.analyze('STU001', FRAME, session_id='exam-1')['session_id'] == 'exam-1'
+        client.close()
+    finally:
+        server.stop()
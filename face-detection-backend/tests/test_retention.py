@@ -0,0 +1,73 @@
+"""
+Free-disk retention: evidence is only deleted when that restores the free space
+"""
+import collections
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import retention
+from retention import RetentionManager
+
+DiskUsage = collections.namedtuple('DiskUsage', 'total used free')
+FRAME_BYTES = 1000
+DAY = 86400
+
+
+def make_evidence(root, age_seconds):
+    """Three frames for each of two students, all `age_seconds` old"""
+    now = time.time()
+    for student in ('STU001', 'STU002'):
+        folder = root / student
+        folder.mkdir()
+        for idx in range(3):
+            path = folder / f'face_not_detected_{idx}.jpg'
+            path.write_bytes(b'\0' * FRAME_BYTES)
+            os.utime(path, (now - age_seconds + idx, now - age_seconds + idx))
+
+
+def remaining_frames(root):
+    return sum(len(files) for _, _, files in os.walk(root))
+
+
+def with_free_space(monkeypatch, free):
+    monkeypatch.setattr(retention.shutil, 'disk_usage', lambda path: DiskUsage(10 ** 9, 10 ** 9 - free, free))
+
+
+def test_write_floor_alone_never_deletes(tmp_path, monkeypatch):
+    make_evidence(tmp_path, 2 * DAY)
+    with_free_space(monkeypatch, 0)
+    manager = RetentionManager(str(tmp_path), min_free_bytes=10 ** 6)
+
+    assert manager.run_once() == (0, 0)
+    assert not manager.has_free_space()
+    assert remaining_frames(tmp_path) == 6
+
+
+def test_evidence_kept_when_deleting_cannot_close_the_gap(tmp_path, monkeypatch):
+    make_evidence(tmp_path, 2 * DAY)
+    with_free_space(monkeypatch, 0)
+    manager = RetentionManager(str(tmp_path), reclaim_free_bytes=10 ** 6)
+
+    assert manager.run_once() == (0, 0)
+    assert remaining_frames(tmp_path) == 6
+
+
+def test_oldest_evidence_deleted_when_it_closes_the_gap(tmp_path, monkeypatch):
+    make_evidence(tmp_path, 2 * DAY)
+    with_free_space(monkeypatch, 0)
+    manager = RetentionManager(str(tmp_path), reclaim_free_bytes=2 * FRAME_BYTES)
+
+    assert manager.run_once() == (2, 2 * FRAME_BYTES)
+    assert remaining_frames(tmp_path) == 4
+
+
+def test_recent_evidence_is_protected(tmp_path, monkeypatch):
+    make_evidence(tmp_path, 60)
+    with_free_space(monkeypatch, 0)
+    manager = RetentionManager(str(tmp_path), reclaim_free_bytes=FRAME_BYTES, protect_seconds=DAY)
+
+    assert manager.run_once() == (0, 0)
+    assert remaining_frames(tmp_path) == 6
@@ -0,0 +1,101 @@
+"""
+Cooldown/persistence scenario run against every state backend
+Redis runs against fakeredis (skipped when it is not installed).
+Run from face-detection-backend: python -m pytest -q tests
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_backend import (
+    InProcessStateBackend, SQLiteStateBackend, RedisStateBackend,
+    SAVE_COOLDOWN, SAVE_FIRST_SEEN, SAVE_PENDING, SAVE_READY
+)
+
+COOLDOWN = 5
+MIN_DURATION = 1
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return InProcessStateBackend(stripes=4)
+    if request.param == 'sqlite':
+        return SQLiteStateBackend(str(tmp_path / 'state.db'))
+    fakeredis = pytest.importorskip('fakeredis')
+    return RedisStateBackend(prefix='test', ttl=60, client=fakeredis.FakeRedis())
+
+
+def check(backend, now, reason='face_out_of_frame'):
+    return backend.check_save('STU001', reason, now, COOLDOWN, MIN_DURATION)
+
+
+def test_persistence_then_cooldown(backend):
+    assert check(backend, 100.0) == (SAVE_FIRST_SEEN, 0.0)
+    assert check(backend, 100.5) == (SAVE_PENDING, 0.5)
+    assert check(backend, 101.5) == (SAVE_READY, 1.5)
+
+    # The slot is reserved: frames inside the cooldown are not saved
+    outcome, since_save = check(backend, 103.0)
+    assert outcome == SAVE_COOLDOWN and since_save == pytest.approx(1.5)
+    assert check(backend, 107.0) == (SAVE_READY, 7.0)
+
+
+def test_cancel_save_releases_slot(backend):
+    check(backend, 100.0)
+    assert check(backend, 101.5)[0] == SAVE_READY
+    backend.cancel_save('STU001', 101.5)
+    assert check(backend, 102.0)[0] == SAVE_READY
+
+    # Cancelling a slot that was already taken by a later save is a no-op
+    backend.cancel_save('STU001', 101.5)
+    assert check(backend, 103.0)[0] == SAVE_COOLDOWN
+
+
+def test_frame_state_counts_and_flags(backend):
+    assert backend.frame_state('STU001') == (1, False)
+    assert backend.frame_state('STU001') == (2, False)
+    assert backend.frame_state('STU002') == (1, False)
+
+    check(backend, 100.0)
+    assert backend.frame_state('STU001', count_frame=False) == (None, True)
+    assert backend.frame_state('STU001') == (3, True)
+
+
+def test_clear_issues_restarts_persistence(backend):
+    check(backend, 100.0, 'face_out_of_frame')
+    check(backend, 100.0, 'multiple_faces_detected')
+
+    backend.clear_issues('STU001', 'face_out_of_frame')
+    assert backend.frame_state('STU001', count_frame=False) == (None, True)
+    assert check(backend, 102.0, 'face_out_of_frame') == (SAVE_FIRST_SEEN, 0.0)
+
+    backend.clear_issues('STU001')
+    assert backend.frame_state('STU001', count_frame=False) == (None, False)
+    assert check(backend, 103.0) == (SAVE_FIRST_SEEN, 0.0)
+
+
+def test_evidence_request_is_reserved_until_released(backend):
+    assert backend.reserve_evidence_request('STU001', 100.0, 3)
+    assert not backend.reserve_evidence_request('STU001', 101.0, 3)
+    assert backend.reserve_evidence_request('STU002', 101.0, 3)
+
+    backend.release_evidence_request('STU001')
+    assert backend.reserve_evidence_request('STU001', 102.0, 3)
+
+
+def test_sqlite_threads_share_a_bounded_pool(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / 'state.db'), pool_size=2)
+    threads = [threading.Thread(target=lambda: [backend.frame_state('STU001') for _ in range(20)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.frame_state('STU001') == (161, False)
+    assert backend._pool.qsize() <= 2
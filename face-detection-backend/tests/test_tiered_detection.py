@@ -0,0 +1,77 @@
+"""
+Screen-then-confirm decisions, alone and combined with scale calibration
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calibration import ScaleCalibrator
+from detection import DEFAULT_PARAMS
+from tiered_detection import TieredDetector, student_detector
+
+GRAY = np.zeros((480, 640), np.uint8)
+CENTERED = (200, 150, 150, 150)
+AT_EDGE = (2, 150, 150, 150)
+
+
+class StubTier:
+    """Returns the scene's faces whose width lies within minSize/maxSize, counting calls"""
+
+    def __init__(self, faces):
+        self.faces = list(faces)
+        self.calls = []
+
+    def __call__(self, gray, params, min_size=None, max_size=None):
+        self.calls.append((min_size, max_size))
+        low = min_size[0] if min_size else 0
+        high = max_size[0] if max_size else 10 ** 6
+        return [face for face in self.faces if low <= face[2] <= high]
+
+
+def test_screen_clears_a_centered_face_without_confirmation():
+    tiers = TieredDetector()
+    screen, confirm = StubTier([CENTERED]), StubTier([CENTERED])
+    assert tiers.detector(screen, confirm)(GRAY, DEFAULT_PARAMS) == [CENTERED]
+    assert len(confirm.calls) == 0
+    assert tiers.snapshot()['screened'] == 1
+
+
+def test_doubtful_screens_are_confirmed():
+    tiers = TieredDetector()
+    for screened in ([], [AT_EDGE], [CENTERED, (40, 60, 60, 60)]):
+        confirm = StubTier([CENTERED])
+        assert tiers.detector(StubTier(screened), confirm)(GRAY, DEFAULT_PARAMS) == [CENTERED]
+        assert len(confirm.calls) == 1
+    assert tiers.snapshot()['confirmed'] == 3
+
+
+def test_calibrated_tiers_learn_and_count_separately():
+    calibrator = ScaleCalibrator(samples=3, margin=0.4, full_scan_frames=4)
+    tiers = TieredDetector()
+    # Screening boxes are a little off; the confirm tier sees the true width
+    screen, confirm = StubTier([(2, 150, 140, 140)]), StubTier([AT_EDGE])
+    detect = tiers.detector(
+        screen=calibrator.detector_for('STU001', screen),
+        confirm=calibrator.detector_for('STU001', confirm)
+    )
+    assert student_detector('STU001', tiers, calibrator) is not None
+
+    for _ in range(3):
+        detect(GRAY, DEFAULT_PARAMS)
+    assert calibrator.snapshot() == {'tracked': 2, 'calibrated': 2}
+    assert screen.calls[-1] == (None, None) and confirm.calls[-1] == (None, None)
+
+    # Each tier runs once per frame, so each full-range check comes every 4th frame
+    screen.calls.clear()
+    confirm.calls.clear()
+    for _ in range(8):
+        detect(GRAY, DEFAULT_PARAMS)
+    assert [min_size for min_size, _ in screen.calls].count(None) == 2
+    assert [min_size for min_size, _ in confirm.calls].count(None) == 2
+
+    # Each band is built around its own tier's widths
+    assert confirm.calls[0][0][0] == int(150 * 0.6)
+    assert screen.calls[0][0][0] == int(140 * 0.6)
@@ -0,0 +1,67 @@
+"""
+Two-tier face detection
+Most frames show one well-placed face, which a downscaled image and a coarse
+pyramid find at a fraction of the full cost. Only frames the cheap screen cannot
+clear (no face, several faces, a face near the edge or too small) pay for the
+full-resolution confirmation, and its verdict is the one reported.
+"""
+import threading
+
+from detection import DEFAULT_PARAMS, confirm_faces, screen_clears, screen_faces
+
+
+class TieredDetector:
+    """
+    Builds screen-then-confirm detector callables and counts how frames were settled
+
+    A screen can only clear a frame, never flag it, so every suspicious verdict
+    comes from the full-resolution confirmation stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.screened = 0
+        self.confirmed = 0
+
+    def detector(self, screen=screen_faces, confirm=confirm_faces):
+        """Return a detector callable (gray, params) -> faces using the two tiers"""
+        def detect(gray, params=None):
+            params = params or DEFAULT_PARAMS
+            h, w = gray.shape[:2]
+            faces = screen(gray, params)
+            if screen_clears(faces, w, h, params):
+                with self._lock:
+                    self.screened += 1
+                return faces
+
+            with self._lock:
+                self.confirmed += 1
+            return confirm(gray, params)
+        return detect
+
+    def snapshot(self):
+        """Tier counts for health checks"""
+        with self._lock:
+            total = self.screened + self.confirmed
+            return {
+                'screened': self.screened,
+                'confirmed': self.confirmed,
+                'confirm_rate': round(self.confirmed / total, 4) if total else 0.0
+            }
+
+
+def student_detector(student_key, tiers=None, calibrator=None):
+    """
+    Detector callable for one student from the enabled optimizations
+    `tiers` is a TieredDetector and `calibrator` a ScaleCalibrator (None = disabled);
+    with both, each tier is calibrated on its own. Returns None (plain detect_faces)
+    when neither is enabled.
+    """
+    if tiers is None:
+        return calibrator.detector_for(student_key) if calibrator else None
+    if calibrator is None:
+        return tiers.detector()
+    return tiers.detector(
+        screen=calibrator.detector_for(student_key, screen_faces),
+        confirm=calibrator.detector_for(student_key, confirm_faces)
+    )
@@ -0,0 +1,60 @@
+"""
+Incremental multipart/form-data parsing for batch uploads
+Werkzeug's form parser spools every part before the view runs; this reads the
+request stream in small chunks and hands out one part at a time, so a batch of
+frames is analyzed while it is still being uploaded.
+"""
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload part exceeds the allowed size"""
+
+
+class UploadPart:
+    """One complete form part; `filename` is None for plain fields"""
+
+    __slots__ = ('name', 'filename', 'data')
+
+    def __init__(self, name, filename, data):
+        self.name = name
+        self.filename = filename
+        self.data = data
+
+
+def iter_multipart(stream, boundary, max_part_size, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield UploadPart objects from a multipart body as soon as each part is complete
+    Parts larger than `max_part_size` bytes raise UploadTooLargeError without
+    buffering the rest of the part.
+    """
+    if isinstance(boundary, str):
+        boundary = boundary.encode('latin-1')
+    decoder = MultipartDecoder(boundary)
+
+    part = None
+    chunks = []
+    size = 0
+    while True:
+        event = decoder.next_event()
+
+        if isinstance(event, NeedData):
+            chunk = stream.read(chunk_size)
+            decoder.receive_data(chunk or None)
+        elif isinstance(event, (Field, File)):
+            part = UploadPart(event.name, getattr(event, 'filename', None), None)
+            chunks = []
+            size = 0
+        elif isinstance(event, Data):
+            size += len(event.data)
+            if size > max_part_size:
+                raise UploadTooLargeError(f"Part '{part.name}' exceeds the {max_part_size} byte limit")
+            chunks.append(event.data)
+            if not event.more_data:
+                part.data = b''.join(chunks)
+                chunks = []
+                yield part
+        elif isinstance(event, Epilogue):
+            return